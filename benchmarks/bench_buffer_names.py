@@ -0,0 +1,65 @@
+"""
+Random names for 1k new buffers.
+
+Run from the package root: `python -m benchmarks.bench_buffer_names`
+"""
+from __future__ import annotations
+
+import os
+import random
+from typing import List
+
+from lib.words import BufferNameGenerator
+
+from .common import measure, report
+
+COUNT = 1_000
+WORDS_FILE = os.path.join(os.path.dirname(__file__), os.pardir, "lib", "words.list")
+
+
+def _read_words() -> str:
+    with open(WORDS_FILE, "r") as file:
+        return file.read()
+
+
+def load_words_from_file(filename: str) -> List[str]:
+    """The word list as the plugin read it before the generator."""
+    with open(filename, "r") as file:
+        return [word.strip() for word in file.readlines()]
+
+
+def generate_random_words(num_words: int, word_list: List[str]) -> str:
+    """A random name as the plugin generated it before the generator."""
+    chosen_words = random.sample(word_list, min(num_words, len(word_list)))
+    return "-".join(chosen_words)
+
+
+def main() -> None:
+    def generator():
+        names = BufferNameGenerator(_read_words)
+        return {names.generate() for _ in range(COUNT)}
+
+    def reload_per_buffer():
+        # the word list is read and stripped for every new buffer
+        return {
+            generate_random_words(
+                random.randint(1, 3), load_words_from_file(WORDS_FILE)
+            )
+            for _ in range(COUNT)
+        }
+
+    assert len(generator()) == COUNT
+    report("generator 1k buffers, one load", measure(generator))
+    report("reload words per buffer 1k", measure(reload_per_buffer))
+
+    # names of a tiny word list run out, a suffix keeps them unique
+    def tiny():
+        names = BufferNameGenerator(lambda: "alpha\nbeta\n")
+        return {names.generate() for _ in range(COUNT)}
+
+    assert len(tiny()) == COUNT
+    report("generator 1k buffers, 2 words", measure(tiny))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""
+The commands of the plugin on synthetic buffers from 1KB up to `--max-size`,
+run against the headless API in `benchmarks/fake`. The package dependencies,
+e.g. `more_itertools`, need to be importable.
+
+Every run writes its timings to a JSON file, which a later run can compare
+against:
+
+    python -m benchmarks.bench_commands --output before.json
+    python -m benchmarks.bench_commands --compare before.json
+    python -m benchmarks.bench_commands --max-size 100MB --only find
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .common import measure, report
+from .harness import (
+    ROOT,
+    SIZES,
+    load_plugin,
+    new_view,
+    parse_size,
+    synthetic_text,
+    use_fake_rg,
+    wait_for_jobs,
+)
+
+NEEDLE = r"(?i)needle[-_]?\w+"
+
+
+def _repeat(size: int) -> int:
+    return 5 if size <= SIZES["1MB"] else 3 if size <= SIZES["10MB"] else 1
+
+
+def _selected(text: str, pattern: str = NEEDLE) -> Callable[[], Any]:
+    """A setup, which selects every match of the pattern in a new view."""
+
+    def setup() -> Any:
+        view = new_view(text)
+        view.sel().add_all(view.find_all(pattern))
+        return view
+
+    return setup
+
+
+def bench_find_single(text: str, repeat: int) -> float:
+    plugin = load_plugin()
+
+    def run(view: Any) -> None:
+        plugin.BufferUtilsFindRegexCommand(view).run(None, False, NEEDLE)
+
+    return measure(run, repeat, lambda: new_view(text))
+
+
+def bench_find_multi(text: str, repeat: int) -> float:
+    plugin = load_plugin()
+    expression = rf"{NEEDLE} ;; -needle_foo ;; \bbaz\w*"
+
+    def run(view: Any) -> None:
+        plugin.BufferUtilsFindRegexCommand(view).run(None, False, expression)
+
+    return measure(run, repeat, lambda: new_view(text))
+
+
+def bench_find_in_selection(text: str, repeat: int) -> float:
+    plugin = load_plugin()
+
+    def setup() -> Any:
+        view = new_view(text)
+        # every other line of the buffer
+        view.sel().add_all(view.find_all(r"^.*\n")[::2])
+        return view
+
+    def run(view: Any) -> None:
+        plugin.BufferUtilsFindRegexCommand(view).run(
+            None, False, NEEDLE, scope="selection"
+        )
+
+    return measure(run, repeat, setup)
+
+
+def bench_preserve_case(text: str, repeat: int) -> float:
+    import sublime
+
+    plugin = load_plugin()
+
+    def run(view: Any) -> None:
+        plugin.BufferUtilsPreserveCaseCommand(view).run(
+            sublime.Edit(0), "other-value-name"
+        )
+        view.size()  # apply the queued replacements
+
+    return measure(run, repeat, _selected(text))
+
+
+def bench_fields_push_jump(text: str, repeat: int) -> float:
+    import sublime
+
+    plugin = load_plugin()
+
+    def select(view: Any, regions: List[Any]) -> None:
+        view.sel().clear()
+        view.sel().add_all(regions)
+
+    def run(view: Any) -> None:
+        command = plugin.BufferUtilsSelectionFieldsCommand(view)
+        every_other = list(view.sel())[::2]
+        command.run(sublime.Edit(0), mode="push")
+        for _ in range(100):
+            command.run(sublime.Edit(0), mode="smart")
+        # half of the fields are subtracted and added back
+        select(view, every_other)
+        command.run(sublime.Edit(0), mode="subtract")
+        select(view, every_other)
+        command.run(sublime.Edit(0), mode="add")
+        command.run(sublime.Edit(0), mode="remove")
+
+    return measure(run, repeat, _selected(text))
+
+
+def bench_filter(text: str, repeat: int) -> float:
+    load_plugin()
+    from BufferUtils.plugin.filter import FilterViewOrPanel
+
+    def run(view: Any) -> None:
+        FilterViewOrPanel().filter(view.id(), "needle")
+        view.close()
+
+    return measure(run, repeat, lambda: new_view(text))
+
+
+def bench_occurrences(text: str, repeat: int) -> float:
+    plugin = load_plugin()
+
+    def setup() -> Any:
+        # the index is built untimed, the lookup is timed
+        view = new_view(text)
+        view.sel().add(view.find(r"needle\w+", 0))
+        plugin.BufferUtilsOccurrencesCommand(view).run(None, "count")
+        wait_for_jobs()
+        return view
+
+    def run(view: Any) -> None:
+        plugin.BufferUtilsOccurrencesCommand(view).run(None, "select")
+
+    return measure(run, repeat, setup)
+
+
+def bench_rg(text: str, repeat: int) -> float:
+    import sublime
+
+    plugin = load_plugin()
+    # one vimgrep line of about 80 characters per line of the buffer
+    use_fake_rg(max(1, len(text) // 80))
+    window = sublime.active_window()
+    window.set_folders([ROOT])
+
+    def run(_: Any) -> None:
+        plugin.RgSearchCommand(window).on_done("needle")
+        wait_for_jobs()
+        window.active_view().close()
+
+    return measure(run, repeat, lambda: None)
+
+
+BENCHMARKS: List[Tuple[str, Callable[[str, int], float]]] = [
+    ("find.single", bench_find_single),
+    ("find.multi", bench_find_multi),
+    ("find.selection", bench_find_in_selection),
+    ("preserve_case", bench_preserve_case),
+    ("fields.push_jump", bench_fields_push_jump),
+    ("filter", bench_filter),
+    ("occurrences", bench_occurrences),
+    ("rg", bench_rg),
+]
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _report(name: str, seconds: float, previous: Dict[str, float]) -> None:
+    before = previous.get(name)
+    if not before:
+        report(name, seconds)
+        return
+    print(f"{name:<48} {seconds * 1000:>10.2f} ms {seconds / before:>8.2f}x")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--max-size", default="10MB", help="largest buffer, e.g. 100MB")
+    parser.add_argument("--only", default="", help="run benchmarks with this prefix")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="a results file of an earlier run")
+    args = parser.parse_args(argv)
+
+    max_size = parse_size(args.max_size)
+    previous: Dict[str, float] = {}
+    if args.compare:
+        with open(args.compare, "r") as file:
+            previous = json.load(file)["results"]
+
+    load_plugin()
+    results: Dict[str, float] = {}
+    for label, size in SIZES.items():
+        if size > max_size:
+            break
+        text = synthetic_text(size)
+        for name, benchmark in BENCHMARKS:
+            if not name.startswith(args.only):
+                continue
+            key = f"{name}[{label}]"
+            seconds = benchmark(text, _repeat(size))
+            results[key] = seconds
+            _report(key, seconds, previous)
+
+    with open(args.output, "w") as file:
+        json.dump(
+            {
+                "meta": {
+                    "revision": _git_revision(),
+                    "python": sys.version.split()[0],
+                    "platform": platform.platform(),
+                    "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "max_size": args.max_size,
+                },
+                "results": results,
+            },
+            file,
+            indent=2,
+            sort_keys=True,
+        )
+    print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
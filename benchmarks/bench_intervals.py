@@ -0,0 +1,54 @@
+"""
+Interval sweeps on 100k selections against 100k matches.
+
+Run from the package root: `python -m benchmarks.bench_intervals`
+"""
+from __future__ import annotations
+
+import random
+
+from lib.intervals import ChunkedIntervalSet, IntervalSet
+
+from .common import measure, report
+
+COUNT = 100_000
+
+
+def _random_pairs(count: int, width: int, seed: int):
+    rng = random.Random(seed)
+    pairs = []
+    for _ in range(count):
+        begin = rng.randrange(0, count * 20)
+        pairs.append((begin, begin + rng.randrange(0, width)))
+    return pairs
+
+
+def main() -> None:
+    selection_pairs = _random_pairs(COUNT, 30, seed=1)
+    match_pairs = _random_pairs(COUNT, 10, seed=2)
+    selections = IntervalSet.from_pairs(selection_pairs)
+    matches = IntervalSet.from_pairs(match_pairs)
+
+    report("normalize 100k pairs", measure(lambda: IntervalSet.from_pairs(match_pairs)))
+    report("union 100k + 100k", measure(lambda: selections.union(matches)))
+    report("difference 100k - 100k", measure(lambda: selections.difference(matches)))
+    report(
+        "intersection 100k & 100k",
+        measure(lambda: selections.intersection(matches)),
+    )
+    report(
+        "difference + without_empty",
+        measure(lambda: selections.difference(matches).without_empty()),
+    )
+
+
+    def follow_edits(intervals):
+        register = ChunkedIntervalSet(intervals)
+        for offset in range(100):
+            register.replaced(COUNT * 10 + offset, COUNT * 10 + offset, 1)
+
+    report("follow 100 edits, 100k register", measure(lambda: follow_edits(selections)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Case preserving replacement of 20k selections.
+
+Run from the package root: `python -m benchmarks.bench_preserve_case`
+"""
+from __future__ import annotations
+
+import random
+
+from lib.case import PreserveCase, analyze_string
+
+from .common import measure, report
+
+COUNT = 20_000
+VALUE = "new-value-name"
+SHAPES = ("fooBarBaz", "FooBarBaz", "foo_bar_baz", "FOO_BAR_BAZ", "foo-bar-baz")
+
+
+def _strings(distinct: int, seed: int):
+    rng = random.Random(seed)
+    pool = [f"{rng.choice(SHAPES)}{i}" for i in range(distinct)]
+    return [rng.choice(pool) for _ in range(COUNT)]
+
+
+def main() -> None:
+    engine = PreserveCase()
+    repeated = _strings(100, seed=1)
+    distinct = _strings(COUNT, seed=2)
+
+    def replace_all(strings):
+        analyze_string.cache_clear()
+        engine.replace_all(strings, VALUE)
+
+    report("replace_all 20k, 100 distinct", measure(lambda: replace_all(repeated)))
+    report("replace_all 20k, 20k distinct", measure(lambda: replace_all(distinct)))
+
+    def per_string(strings):
+        analyze_string.cache_clear()
+        new_strings = engine.analyze_string(VALUE).groups
+        for old_string in strings:
+            engine.replace_string_with_case(old_string, new_strings)
+
+    report(
+        "replace per string 20k, 100 distinct",
+        measure(lambda: per_string(repeated)),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""
+Selection transforms on a snapshot of 1M regions.
+
+Run from the package root: `python -m benchmarks.bench_transforms`
+"""
+from __future__ import annotations
+
+from lib import transforms
+from lib.transforms import RegionArrays
+
+from .common import measure, report
+
+COUNT = 1_000_000
+
+
+def main() -> None:
+    # forward regions of two characters, separated by one character
+    pairs = [(3 * i, 3 * i + 2) for i in range(COUNT)]
+    regions = RegionArrays.from_pairs(pairs)
+    inverted = transforms.invert(regions)
+    texts = ["a\nb"] * COUNT
+
+    report("snapshot 1M pairs", measure(lambda: RegionArrays.from_pairs(pairs)))
+    report("toggle 1M", measure(lambda: transforms.toggle(regions)))
+    report("normalize 1M inverted", measure(lambda: transforms.normalize(inverted)))
+    report("collapse_start 1M", measure(lambda: transforms.collapse_start(regions)))
+    report("every_nth 1M / 3", measure(lambda: transforms.every_nth(regions, 3)))
+    report("dedupe 1M", measure(lambda: transforms.dedupe(regions)))
+    report("merge 1M", measure(lambda: transforms.merge(regions)))
+    report("split_lines 1M", measure(lambda: transforms.split_lines(regions, texts)))
+
+
+if __name__ == "__main__":
+    main()
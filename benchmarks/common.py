@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+import time
+from typing import Any, Callable, Optional
+
+
+def measure(
+    func: Callable[..., Any],
+    repeat: int = 5,
+    setup: Optional[Callable[[], Any]] = None,
+) -> float:
+    """
+    Return the best wall time of `repeat` calls in seconds. If given, `setup`
+    runs untimed before every call and its result is passed to `func`.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        args = () if setup is None else (setup(),)
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def report(name: str, seconds: float) -> None:
+    print(f"{name:<48} {seconds * 1000:>10.2f} ms")
@@ -0,0 +1,658 @@
+"""
+A headless stand-in for the parts of the `sublime` module, which the
+plugin uses. It runs under plain CPython and keeps the buffer in one string.
+
+Differences to Sublime Text worth knowing when reading results:
+- patterns are matched by `re` instead of Oniguruma,
+- regions and the selection do not follow edits,
+- timeouts run immediately on the calling thread.
+"""
+from __future__ import annotations
+
+import re
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+LITERAL = 1
+IGNORECASE = 2
+WHOLEWORD = 4
+REVERSE = 8
+WRAP = 16
+
+DRAW_EMPTY = 1
+HIDE_ON_MINIMAP = 2
+DRAW_EMPTY_AS_OVERWRITE = 4
+PERSISTENT = 16
+DRAW_NO_FILL = 32
+DRAW_NO_OUTLINE = 256
+HIDDEN = 128
+
+_windows: List["Window"] = []
+_settings: Dict[str, "Settings"] = {}
+_next_id = [0]
+
+
+def _new_id() -> int:
+    _next_id[0] += 1
+    return _next_id[0]
+
+
+class Region:
+    __slots__ = ("a", "b", "xpos")
+
+    def __init__(self, a: int, b: Optional[int] = None, xpos: int = -1) -> None:
+        self.a: int = a
+        self.b: int = a if b is None else b
+        self.xpos: int = xpos
+
+    def __repr__(self) -> str:
+        return f"Region({self.a}, {self.b})"
+
+    def __len__(self) -> int:
+        return self.size()
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, Region) and self.a == other.a and self.b == other.b
+
+    def __lt__(self, other: "Region") -> bool:
+        return self.begin() < other.begin()
+
+    def __hash__(self) -> int:
+        return hash((self.a, self.b))
+
+    def __contains__(self, value: Union["Region", int]) -> bool:
+        return self.contains(value)
+
+    def to_tuple(self) -> Tuple[int, int]:
+        return (self.a, self.b)
+
+    def begin(self) -> int:
+        return self.a if self.a < self.b else self.b
+
+    def end(self) -> int:
+        return self.b if self.a < self.b else self.a
+
+    def size(self) -> int:
+        return abs(self.b - self.a)
+
+    def empty(self) -> bool:
+        return self.a == self.b
+
+    def cover(self, other: "Region") -> "Region":
+        return Region(min(self.begin(), other.begin()), max(self.end(), other.end()))
+
+    def intersection(self, other: "Region") -> "Region":
+        if not self.intersects(other):
+            return Region(0)
+        return Region(max(self.begin(), other.begin()), min(self.end(), other.end()))
+
+    def intersects(self, other: "Region") -> bool:
+        lb, le, rb, re_ = self.begin(), self.end(), other.begin(), other.end()
+        return (lb == rb and le == re_) or (rb < le and lb < re_)
+
+    def contains(self, value: Union["Region", int]) -> bool:
+        if isinstance(value, Region):
+            return self.begin() <= value.begin() and value.end() <= self.end()
+        return self.begin() <= value <= self.end()
+
+
+class Selection:
+    """
+    Sorted regions, where overlapping regions are merged as in Sublime Text.
+    Regions which only touch, e.g. `(0, 3)` and `(3, 6)`, stay apart.
+    """
+
+    def __init__(self, view_id: int) -> None:
+        self.view_id: int = view_id
+        self.regions: List[Region] = []
+
+    def __iter__(self) -> Iterator[Region]:
+        return iter(list(self.regions))
+
+    def __len__(self) -> int:
+        return len(self.regions)
+
+    def __getitem__(self, index: int) -> Region:
+        return self.regions[index]
+
+    def __bool__(self) -> bool:
+        return bool(self.regions)
+
+    def is_valid(self) -> bool:
+        return True
+
+    def clear(self) -> None:
+        self.regions = []
+
+    def add(self, region: Union[Region, int]) -> None:
+        self.add_all([region])
+
+    def add_all(self, regions: Any) -> None:
+        added = [r if isinstance(r, Region) else Region(r) for r in regions]
+        self.regions = _merge_selection(self.regions + added)
+
+    def subtract(self, region: Region) -> None:
+        result = []
+        for current in self.regions:
+            if not current.intersects(region):
+                result.append(current)
+                continue
+            if current.begin() < region.begin():
+                result.append(Region(current.begin(), region.begin()))
+            if region.end() < current.end():
+                result.append(Region(region.end(), current.end()))
+        self.regions = result
+
+    def contains(self, region: Region) -> bool:
+        return any(current.contains(region) for current in self.regions)
+
+
+def _merge_selection(regions: List[Region]) -> List[Region]:
+    regions = sorted(regions, key=lambda r: (r.begin(), r.end()))
+    merged: List[Region] = []
+    for region in regions:
+        last = merged[-1] if merged else None
+        # regions which only touch stay apart, unless one of them is a cursor
+        if last is not None and (
+            region.begin() < last.end()
+            or (region.begin() == last.end() and (region.empty() or last.empty()))
+        ):
+            if region.end() > last.end():
+                merged[-1] = Region(last.begin(), region.end())
+            continue
+        merged.append(region)
+    return merged
+
+
+class Settings:
+    def __init__(self, values: Optional[Dict[str, Any]] = None) -> None:
+        self.values: Dict[str, Any] = dict(values or {})
+        self.callbacks: Dict[str, Callable[[], None]] = {}
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.values.get(key, default)
+
+    def has(self, key: str) -> bool:
+        return key in self.values
+
+    def set(self, key: str, value: Any) -> None:
+        self.values[key] = value
+        for callback in list(self.callbacks.values()):
+            callback()
+
+    def erase(self, key: str) -> None:
+        self.values.pop(key, None)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.values)
+
+    def add_on_change(self, tag: str, callback: Callable[[], None]) -> None:
+        self.callbacks[tag] = callback
+
+    def clear_on_change(self, tag: str) -> None:
+        self.callbacks.pop(tag, None)
+
+
+class Syntax:
+    def __init__(self, path: str, name: str, hidden: bool, scope: str) -> None:
+        self.path: str = path
+        self.name: str = name
+        self.hidden: bool = hidden
+        self.scope: str = scope
+
+
+_SYNTAXES = [
+    Syntax("Packages/Text/Plain text.tmLanguage", "Plain Text", False, "text.plain"),
+    Syntax(
+        "Packages/Python/Python.sublime-syntax", "Python", False, "source.python"
+    ),
+]
+
+
+class Edit:
+    def __init__(self, edit_token: int) -> None:
+        self.edit_token: int = edit_token
+
+
+class Buffer:
+    def __init__(self) -> None:
+        self.buffer_id: int = _new_id()
+        self._views: List["View"] = []
+
+    def id(self) -> int:
+        return self.buffer_id
+
+    def views(self) -> List["View"]:
+        return list(self._views)
+
+    def primary_view(self) -> "View":
+        return self._views[0]
+
+
+class View:
+    """
+    A view over a string buffer. Replacements in descending order, as issued
+    by the plugin, are queued and spliced into the buffer in one pass.
+    """
+
+    def __init__(self, window: Optional["Window"] = None, text: str = "") -> None:
+        self.view_id: int = _new_id()
+        self._window: Optional["Window"] = window
+        self._buffer = Buffer()
+        self._buffer._views.append(self)
+        self._text: str = text
+        self._edits: List[Tuple[int, int, str]] = []
+        self._sel = Selection(self.view_id)
+        self._settings = Settings()
+        self._regions: Dict[str, List[Region]] = {}
+        self._status: Dict[str, str] = {}
+        self._name: str = ""
+        self._file_name: Optional[str] = None
+        self._scratch: bool = False
+        self._read_only: bool = False
+        self._syntax: Syntax = _SYNTAXES[0]
+        self._change_count: int = 0
+        self._valid: bool = True
+        # the number of characters shown by `visible_region`
+        self.viewport_size: int = 10_000
+
+    def __repr__(self) -> str:
+        return f"View({self.view_id})"
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, View) and other.view_id == self.view_id
+
+    def __hash__(self) -> int:
+        return self.view_id
+
+    def id(self) -> int:
+        return self.view_id
+
+    def buffer_id(self) -> int:
+        return self._buffer.buffer_id
+
+    def buffer(self) -> Buffer:
+        return self._buffer
+
+    def window(self) -> Optional["Window"]:
+        return self._window
+
+    def is_valid(self) -> bool:
+        return self._valid
+
+    def close(self) -> bool:
+        self._valid = False
+        if self._window is not None:
+            self._window._remove(self)
+        return True
+
+    def name(self) -> str:
+        return self._name
+
+    def set_name(self, name: str) -> None:
+        self._name = name
+
+    def file_name(self) -> Optional[str]:
+        return self._file_name
+
+    def set_scratch(self, scratch: bool) -> None:
+        self._scratch = scratch
+
+    def is_read_only(self) -> bool:
+        return self._read_only
+
+    def set_read_only(self, read_only: bool) -> None:
+        self._read_only = read_only
+
+    def settings(self) -> Settings:
+        return self._settings
+
+    def syntax(self) -> Syntax:
+        return self._syntax
+
+    def assign_syntax(self, syntax: Union[str, Syntax]) -> None:
+        if isinstance(syntax, Syntax):
+            self._syntax = syntax
+            return
+        for candidate in _SYNTAXES:
+            if candidate.path == syntax:
+                self._syntax = candidate
+                return
+        self._syntax = Syntax(syntax, syntax.rsplit("/", 1)[-1], False, "text")
+
+    def set_syntax_file(self, syntax: str) -> None:
+        self.assign_syntax(syntax)
+
+    def change_count(self) -> int:
+        return self._change_count
+
+    def size(self) -> int:
+        self._flush()
+        return len(self._text)
+
+    def substr(self, value: Union[Region, int]) -> str:
+        self._flush()
+        if isinstance(value, Region):
+            return self._text[value.begin() : value.end()]
+        return self._text[value : value + 1]
+
+    def find(self, pattern: str, start_pt: int, flags: int = 0) -> Region:
+        self._flush()
+        match = _compile(pattern, flags).search(self._text, start_pt)
+        return Region(match.start(), match.end()) if match else Region(-1)
+
+    def find_all(self, pattern: str, flags: int = 0, *args: Any) -> List[Region]:
+        self._flush()
+        return [
+            Region(match.start(), match.end())
+            for match in _compile(pattern, flags).finditer(self._text)
+        ]
+
+    def sel(self) -> Selection:
+        return self._sel
+
+    def visible_region(self) -> Region:
+        return Region(0, min(self.size(), self.viewport_size))
+
+    def show(self, *args: Any, **kwargs: Any) -> None:
+        pass
+
+    def show_at_center(self, *args: Any, **kwargs: Any) -> None:
+        pass
+
+    def line(self, value: Union[Region, int]) -> Region:
+        self._flush()
+        point = value.begin() if isinstance(value, Region) else value
+        begin = self._text.rfind("\n", 0, point) + 1
+        end = self._text.find("\n", point)
+        return Region(begin, len(self._text) if end == -1 else end)
+
+    def word(self, value: Union[Region, int]) -> Region:
+        self._flush()
+        point = value.begin() if isinstance(value, Region) else value
+        before = re.search(r"\w*$", self._text[max(0, point - 256) : point])
+        after = re.match(r"\w*", self._text[point : point + 256])
+        begin, end = point - len(before.group()), point + len(after.group())
+        return Region(begin, end)
+
+    def full_line(self, value: Union[Region, int]) -> Region:
+        line = self.line(value)
+        return Region(line.a, min(line.b + 1, len(self._text)))
+
+    def rowcol(self, point: int) -> Tuple[int, int]:
+        self._flush()
+        row = self._text.count("\n", 0, point)
+        return row, point - (self._text.rfind("\n", 0, point) + 1)
+
+    def text_point(self, row: int, col: int) -> int:
+        self._flush()
+        point = 0
+        for _ in range(row):
+            point = self._text.find("\n", point) + 1
+            if not point:
+                return len(self._text)
+        return point + col
+
+    def add_regions(
+        self,
+        key: str,
+        regions: List[Region],
+        scope: str = "",
+        icon: str = "",
+        flags: int = 0,
+        *args: Any,
+        **kwargs: Any,
+    ) -> None:
+        self._regions[key] = list(regions)
+
+    def get_regions(self, key: str) -> List[Region]:
+        return list(self._regions.get(key, []))
+
+    def erase_regions(self, key: str) -> None:
+        self._regions.pop(key, None)
+
+    def set_status(self, key: str, value: str) -> None:
+        self._status[key] = value
+
+    def get_status(self, key: str) -> str:
+        return self._status.get(key, "")
+
+    def erase_status(self, key: str) -> None:
+        self._status.pop(key, None)
+
+    def insert(self, edit: Edit, point: int, text: str) -> int:
+        self.replace(edit, Region(point), text)
+        return len(text)
+
+    def erase(self, edit: Edit, region: Region) -> None:
+        self.replace(edit, region, "")
+
+    def replace(self, edit: Edit, region: Region, text: str) -> None:
+        begin, end = region.begin(), region.end()
+        if self._edits and end > self._edits[-1][0]:
+            self._flush()
+        self._edits.append((begin, end, text))
+        self._change_count += 1
+
+    def run_command(self, cmd: str, args: Optional[Dict[str, Any]] = None) -> None:
+        args = args or {}
+        if cmd == "append":
+            self._flush()
+            self._text += args.get("characters", "")
+            self._change_count += 1
+        elif cmd == "erase_view":
+            self._flush()
+            self._text = ""
+            self._change_count += 1
+        else:
+            import sublime_plugin
+
+            sublime_plugin.run_text_command(self, cmd, args)
+
+    def _flush(self) -> None:
+        if not self._edits:
+            return
+        edits, self._edits = self._edits, []
+        pieces: List[str] = []
+        end = len(self._text)
+        for begin, stop, text in edits:
+            pieces.append(self._text[stop:end])
+            pieces.append(text)
+            end = begin
+        pieces.append(self._text[:end])
+        self._text = "".join(reversed(pieces))
+
+
+class Window:
+    def __init__(self) -> None:
+        self.window_id: int = _new_id()
+        self._views: List[View] = []
+        self._panels: Dict[str, View] = {}
+        self._folders: List[str] = []
+        self._active: Optional[View] = None
+        self.shown_panel: Optional[str] = None
+
+    def id(self) -> int:
+        return self.window_id
+
+    def is_valid(self) -> bool:
+        return True
+
+    def views(self) -> List[View]:
+        return list(self._views)
+
+    def active_view(self) -> Optional[View]:
+        return self._active
+
+    def focus_view(self, view: View) -> None:
+        self._active = view
+
+    def new_file(self, flags: int = 0, syntax: str = "") -> View:
+        view = View(self)
+        if syntax:
+            view.assign_syntax(syntax)
+        self._views.append(view)
+        self._active = view
+        return view
+
+    def _remove(self, view: View) -> None:
+        if view in self._views:
+            self._views.remove(view)
+        for name, panel in list(self._panels.items()):
+            if panel is view:
+                del self._panels[name]
+        if self._active is view:
+            self._active = self._views[-1] if self._views else None
+
+    def create_output_panel(self, name: str, unlisted: bool = False) -> View:
+        panel = self._panels.get(name)
+        if panel is None:
+            panel = self._panels[name] = View(self)
+        return panel
+
+    def find_output_panel(self, name: str) -> Optional[View]:
+        return self._panels.get(name)
+
+    def destroy_output_panel(self, name: str) -> None:
+        self._panels.pop(name, None)
+
+    def panels(self) -> List[str]:
+        return [f"output.{name}" for name in self._panels]
+
+    def folders(self) -> List[str]:
+        return list(self._folders)
+
+    def set_folders(self, folders: List[str]) -> None:
+        self._folders = list(folders)
+
+    def show_input_panel(self, *args: Any, **kwargs: Any) -> View:
+        return View(self)
+
+    def run_command(self, cmd: str, args: Optional[Dict[str, Any]] = None) -> None:
+        args = args or {}
+        if cmd == "show_panel":
+            self.shown_panel = args.get("panel")
+        elif cmd == "hide_panel":
+            self.shown_panel = None
+        else:
+            import sublime_plugin
+
+            sublime_plugin.run_window_command(self, cmd, args)
+
+
+class Html:
+    __slots__ = ("data",)
+
+    def __init__(self, data: str) -> None:
+        self.data: str = data
+
+    def __str__(self) -> str:
+        return self.data
+
+
+class ListInputItem:
+    def __init__(
+        self,
+        text: str,
+        value: Any,
+        details: Any = "",
+        annotation: str = "",
+        kind: Any = None,
+    ) -> None:
+        self.text: str = text
+        self.value: Any = value
+        self.details: Any = details
+        self.annotation: str = annotation
+        self.kind: Any = kind
+
+
+_PATTERNS: Dict[Tuple[str, int], "re.Pattern[str]"] = {}
+
+
+def _compile(pattern: str, flags: int) -> "re.Pattern[str]":
+    compiled = _PATTERNS.get((pattern, flags))
+    if compiled is None:
+        expression = re.escape(pattern) if flags & LITERAL else pattern
+        if flags & WHOLEWORD:
+            expression = rf"\b{expression}\b"
+        compiled = re.compile(
+            expression, re.MULTILINE | (re.IGNORECASE if flags & IGNORECASE else 0)
+        )
+        _PATTERNS[(pattern, flags)] = compiled
+    return compiled
+
+
+def active_window() -> Window:
+    if not _windows:
+        _windows.append(Window())
+    return _windows[-1]
+
+
+def windows() -> List[Window]:
+    return list(_windows)
+
+
+def load_settings(base_name: str) -> Settings:
+    settings = _settings.get(base_name)
+    if settings is None:
+        settings = _settings[base_name] = Settings()
+    return settings
+
+
+def save_settings(base_name: str) -> None:
+    pass
+
+
+def load_resource(name: str) -> str:
+    raise FileNotFoundError(name)
+
+
+def list_syntaxes() -> List[Syntax]:
+    return list(_SYNTAXES)
+
+
+def set_timeout(callback: Callable[[], Any], delay: int = 0) -> None:
+    callback()
+
+
+def set_timeout_async(callback: Callable[[], Any], delay: int = 0) -> None:
+    callback()
+
+
+def status_message(msg: str) -> None:
+    pass
+
+
+def error_message(msg: str) -> None:
+    pass
+
+
+def message_dialog(msg: str) -> None:
+    pass
+
+
+def command_url(cmd: str, args: Optional[Dict[str, Any]] = None) -> str:
+    return f"subl:{cmd}"
+
+
+def packages_path() -> str:
+    return ""
+
+
+def installed_packages_path() -> str:
+    return ""
+
+
+def cache_path() -> str:
+    import tempfile
+
+    return tempfile.gettempdir()
+
+
+def version() -> str:
+    return "4180"
+
+
+def platform() -> str:
+    import sys
+
+    return {"darwin": "osx", "win32": "windows"}.get(sys.platform, "linux")
@@ -0,0 +1,127 @@
+"""A headless stand-in for the parts of `sublime_plugin`, which the plugin uses."""
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, List, Optional, Type
+
+import sublime
+
+_text_commands: Dict[str, Type["TextCommand"]] = {}
+_window_commands: Dict[str, Type["WindowCommand"]] = {}
+
+
+def command_name(cls: type) -> str:
+    """The name of a command class as Sublime Text derives it."""
+    name = cls.__name__
+    if name.endswith("Command"):
+        name = name[: -len("Command")]
+    return re.sub(r"(?<=[a-z0-9])([A-Z])", r"_\1", name).lower()
+
+
+def run_text_command(
+    view: sublime.View, cmd: str, args: Optional[Dict[str, Any]] = None
+) -> Any:
+    command = _text_commands[cmd](view)
+    return command.run(sublime.Edit(0), **(args or {}))
+
+
+def run_window_command(
+    window: sublime.Window, cmd: str, args: Optional[Dict[str, Any]] = None
+) -> Any:
+    command = _window_commands[cmd](window)
+    return command.run(**(args or {}))
+
+
+class Command:
+    def is_enabled(self) -> bool:
+        return True
+
+    def is_visible(self) -> bool:
+        return True
+
+    def name(self) -> str:
+        return command_name(type(self))
+
+
+class TextCommand(Command):
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        _text_commands[command_name(cls)] = cls
+
+    def __init__(self, view: sublime.View) -> None:
+        self.view: sublime.View = view
+
+
+class WindowCommand(Command):
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        _window_commands[command_name(cls)] = cls
+
+    def __init__(self, window: sublime.Window) -> None:
+        self.window: sublime.Window = window
+
+
+class ApplicationCommand(Command):
+    pass
+
+
+class EventListener:
+    pass
+
+
+class ViewEventListener:
+    def __init__(self, view: sublime.View) -> None:
+        self.view: sublime.View = view
+
+
+class TextChangeListener:
+    def __init__(self) -> None:
+        self.buffer: Optional[sublime.Buffer] = None
+
+    @classmethod
+    def is_applicable(cls, buffer: sublime.Buffer) -> bool:
+        return True
+
+    def attach(self, buffer: sublime.Buffer) -> None:
+        self.buffer = buffer
+
+    def detach(self) -> None:
+        self.buffer = None
+
+    def is_attached(self) -> bool:
+        return self.buffer is not None
+
+
+class CommandInputHandler:
+    def name(self) -> str:
+        return command_name(type(self)).replace("_input_handler", "")
+
+    def placeholder(self) -> str:
+        return ""
+
+    def initial_text(self) -> str:
+        return ""
+
+    def preview(self, arg: Any) -> Any:
+        return None
+
+    def validate(self, arg: Any) -> bool:
+        return True
+
+    def cancel(self) -> None:
+        pass
+
+    def confirm(self, arg: Any) -> Any:
+        return arg
+
+    def next_input(self, args: Dict[str, Any]) -> Optional["CommandInputHandler"]:
+        return None
+
+
+class TextInputHandler(CommandInputHandler):
+    pass
+
+
+class ListInputHandler(CommandInputHandler):
+    def list_items(self) -> List[Any]:
+        return []
@@ -0,0 +1,117 @@
+"""
+Loads the plugin against the headless API in `benchmarks/fake` and builds
+synthetic buffers for the command benchmarks.
+"""
+from __future__ import annotations
+
+import importlib
+import os
+import random
+import re
+import sys
+import time
+import types
+from typing import Any, Dict, List
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCHMARKS)
+FAKE_PATH = os.path.join(BENCHMARKS, "fake")
+FAKE_BIN = os.path.join(FAKE_PATH, "bin")
+
+# the name of the package as installed, such that relative imports resolve
+PACKAGE_NAME = "BufferUtils"
+
+SIZES: Dict[str, int] = {
+    "1KB": 1 << 10,
+    "100KB": 100 << 10,
+    "1MB": 1 << 20,
+    "10MB": 10 << 20,
+    "100MB": 100 << 20,
+}
+
+_WORDS = ("foo", "bar", "baz", "value", "item", "result", "buffer", "region")
+
+
+def _identifier(rng: random.Random, first: str, second: str) -> str:
+    """The words joined in snake, camel, pascal, kebab or upper case."""
+    return rng.choice(
+        (
+            f"{first}_{second}",
+            f"{first}{second.capitalize()}",
+            f"{first.capitalize()}{second.capitalize()}",
+            f"{first}-{second}",
+            f"{first}_{second}".upper(),
+        )
+    )
+
+
+def parse_size(value: str) -> int:
+    """Parse sizes such as `512`, `100KB` or `10MB` into bytes."""
+    match = re.fullmatch(r"(\d+)\s*([KMG]?)B?", value.strip().upper())
+    if not match:
+        raise ValueError(f"invalid size: {value}")
+    number, unit = match.groups()
+    return int(number) << {"": 0, "K": 10, "M": 20, "G": 30}[unit]
+
+
+def load_plugin() -> types.ModuleType:
+    """Import the plugin package with the fake `sublime` modules."""
+    if FAKE_PATH not in sys.path:
+        sys.path.insert(0, FAKE_PATH)
+    if PACKAGE_NAME not in sys.modules:
+        package = types.ModuleType(PACKAGE_NAME)
+        package.__path__ = [ROOT]
+        sys.modules[PACKAGE_NAME] = package
+    return importlib.import_module(f"{PACKAGE_NAME}.plugin")
+
+
+def use_fake_rg(lines: int) -> None:
+    """Put the fake `rg` first on the PATH, printing `lines` matches."""
+    path = os.environ.get("PATH", "")
+    if not path.startswith(FAKE_BIN):
+        os.environ["PATH"] = os.pathsep.join((FAKE_BIN, path))
+    os.environ["FAKE_RG_LINES"] = str(lines)
+
+
+def synthetic_text(size: int, seed: int = 0) -> str:
+    """
+    Code like text of `size` characters. About every 8th line contains a
+    `needle` identifier in one of several cases.
+    """
+    rng = random.Random(seed)
+    lines: List[str] = []
+    length = 0
+    # a block is repeated to build large buffers quickly
+    while length < min(size, 1 << 16):
+        first, second = rng.sample(_WORDS, 2)
+        name = _identifier(rng, first, second)
+        if rng.randrange(8) == 0:
+            needle = _identifier(rng, "needle", rng.choice(_WORDS))
+            line = f"    {name} = {needle}({rng.randrange(1000)})\n"
+        else:
+            line = f"    {name} = {rng.choice(_WORDS)}.get({rng.randrange(1000)})\n"
+        lines.append(line)
+        length += len(line)
+    block = "".join(lines)
+    text = block * (size // len(block) + 1)
+    return text[:size]
+
+
+def wait_for_jobs(timeout: float = 60.0) -> None:
+    """Block until the background jobs of the plugin are done."""
+    from BufferUtils.plugin.jobs import executor
+
+    deadline = time.monotonic() + timeout
+    while not executor.idle():
+        if time.monotonic() > deadline:
+            raise TimeoutError("background jobs did not finish")
+        time.sleep(0.001)
+
+
+def new_view(text: str) -> Any:
+    """A view in the active window, which contains the text."""
+    import sublime
+
+    view = sublime.active_window().new_file()
+    view.run_command("append", {"characters": text})
+    return view
@@ -0,0 +1,139 @@
+"""
+Peak Python allocations of large-buffer operations, traced with `tracemalloc`
+and checked against a budget per operation. Exits with 1 if any operation
+exceeds its budget.
+
+Run from the package root: `python -m benchmarks.memory [--size 10MB]`
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .harness import (
+    ROOT,
+    load_plugin,
+    new_view,
+    parse_size,
+    synthetic_text,
+    use_fake_rg,
+    wait_for_jobs,
+)
+
+NEEDLE = r"(?i)needle[-_]?\w+"
+
+# the allowed peak as a multiple of the input size, plus `SLACK` bytes
+BUDGETS: Dict[str, float] = {
+    "rg.run_rg_search": 2.6,
+    "rg.on_done": 2.6,
+    "find.preview": 1.0,
+    "find.command": 2.0,
+    "filter": 1.0,
+    # streamed, only one batch of matches is held at a time
+    "filter.export": 0.1,
+}
+SLACK = 1 << 20
+
+Operation = Tuple[Callable[[], Any], Callable[[Any], Any]]
+
+
+def trace_peak(setup: Callable[[], Any], func: Callable[[Any], Any]) -> int:
+    """The peak of the memory allocated by `func`, setup is not traced."""
+    state = setup()
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        func(state)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return peak - base
+
+
+def operations(text: str) -> Dict[str, Operation]:
+    plugin = load_plugin()
+    import sublime
+    from BufferUtils.plugin.buffer import ExpressionInputHandler
+    from BufferUtils.plugin.filter import FilterViewOrPanel
+
+    window = sublime.active_window()
+    window.set_folders([ROOT])
+    # about one 80 character vimgrep line per line of the buffer
+    use_fake_rg(max(1, len(text) // 80))
+
+    def selected() -> Any:
+        view = new_view(text)
+        view.sel().add_all(view.find_all(NEEDLE))
+        return view
+
+    def preview(view: Any) -> None:
+        handler = ExpressionInputHandler(view, {"subtractive": False})
+        handler.preview("needle")
+        wait_for_jobs()
+        handler.cancel()
+
+    def export(view: Any) -> None:
+        path = os.path.join(tempfile.gettempdir(), "bench_filter_export.txt")
+        plugin.BufferUtilsFilterViewOrPanelCommand(window).run(
+            str(view.id()), "needle", "file", path
+        )
+        wait_for_jobs()
+        os.remove(path)
+
+    def on_done(_: Any) -> None:
+        plugin.RgSearchCommand(window).on_done("needle")
+        wait_for_jobs()
+        window.active_view().close()
+
+    return {
+        "rg.run_rg_search": (
+            lambda: plugin.RgSearchCommand(window),
+            lambda command: command.run_rg_search(ROOT, "needle"),
+        ),
+        "rg.on_done": (lambda: None, on_done),
+        "find.preview": (selected, preview),
+        "find.command": (
+            lambda: new_view(text),
+            lambda view: plugin.BufferUtilsFindRegexCommand(view).run(
+                None, False, NEEDLE
+            ),
+        ),
+        "filter": (
+            lambda: new_view(text),
+            lambda view: FilterViewOrPanel().filter(view.id(), "needle"),
+        ),
+        "filter.export": (lambda: new_view(text), export),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", default="10MB", help="the input size, e.g. 1MB")
+    args = parser.parse_args(argv)
+
+    size = parse_size(args.size)
+    text = synthetic_text(size)
+    failures = []
+    for name, (setup, func) in operations(text).items():
+        peak = trace_peak(setup, func)
+        budget = int(BUDGETS[name] * size) + SLACK
+        status = "ok" if peak <= budget else "OVER BUDGET"
+        print(
+            f"{name:<24} peak {peak / (1 << 20):>9.2f} MB "
+            f"({peak / size:>5.2f}x) budget {budget / (1 << 20):>9.2f} MB  {status}"
+        )
+        if peak > budget:
+            failures.append(name)
+
+    if failures:
+        print(f"Over budget: {', '.join(failures)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
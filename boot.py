@@ -14,4 +14,7 @@ def reload_plugin() -> None:
 
 reload_plugin()
 
-from .plugin import *  # noqa: E402, F403
+from .lib.startup import import_timer  # noqa: E402
+
+with import_timer(f"{__package__}."):
+    from .plugin import *  # noqa: E402, F403
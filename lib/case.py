@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import Dict, List, Sequence, Tuple
+
+SEPARATORS = "-_/. "
+
+_CASE_SPLIT = re.compile(r"[A-Z]?[^A-Z]*")
+
+
+class Case:
+    LOWER = 0
+    UPPER = 1
+    CAPITALIZED = 2
+    MIXED = 3
+
+
+class StringAttributes:
+    __slots__ = ("delimiter", "case_types", "groups")
+
+    def __init__(
+        self, delimiter: str, case_types: Tuple[int, ...], groups: Tuple[str, ...]
+    ) -> None:
+        self.delimiter: str = delimiter
+        self.case_types: Tuple[int, ...] = case_types
+        self.groups: Tuple[str, ...] = groups
+
+
+@lru_cache(maxsize=4096)
+def analyze_string(value: str) -> StringAttributes:
+    """
+    Split the value into its groups and detect the case of each group.
+    The result is cached and therefore immutable.
+    """
+    counts = [value.count(separator) for separator in SEPARATORS]
+    most = max(counts)
+
+    if most > 0:
+        separator = SEPARATORS[counts.index(most)]
+        groups = tuple(value.split(separator))
+    else:
+        separator = ""
+        groups = tuple(part for part in _CASE_SPLIT.findall(value) if part)
+
+    return StringAttributes(
+        separator, tuple(_get_case_type(s) for s in groups), groups
+    )
+
+
+def _get_case_type(value: str) -> int:
+    if value.islower():
+        return Case.LOWER
+    elif value.isupper():
+        return Case.UPPER
+    elif value.istitle():
+        return Case.CAPITALIZED
+    return Case.MIXED
+
+
+class PreserveCase:
+    def analyze_string(self, value: str) -> StringAttributes:
+        return analyze_string(value)
+
+    def replace_string_with_case(
+        self, old_string: str, new_strings: Sequence[str]
+    ) -> str:
+        old_string_meta = analyze_string(old_string)
+        old_cases = old_string_meta.case_types
+        if not old_cases:
+            return old_string_meta.delimiter.join(new_strings)
+
+        result = []
+        for i, current_str in enumerate(new_strings):
+            case_type = old_cases[min(i, len(old_cases) - 1)]
+
+            if case_type == Case.UPPER:
+                current_str = current_str.upper()
+            elif case_type == Case.LOWER:
+                current_str = current_str.lower()
+            elif case_type == Case.CAPITALIZED:
+                current_str = current_str.capitalize()
+            result.append(current_str)
+
+        return old_string_meta.delimiter.join(result)
+
+    def replace_all(self, old_strings: Sequence[str], value: str) -> List[str]:
+        """
+        Replace every old string with the value in its case. Each distinct
+        old string is only analyzed and replaced once.
+        """
+        new_strings = analyze_string(value).groups
+        replaced: Dict[str, str] = {}
+        result = []
+        for old_string in old_strings:
+            new_string = replaced.get(old_string)
+            if new_string is None:
+                new_string = self.replace_string_with_case(old_string, new_strings)
+                replaced[old_string] = new_string
+            result.append(new_string)
+        return result
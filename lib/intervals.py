@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left
+from typing import Iterable, Iterator, List, Tuple
+
+Interval = Tuple[int, int]
+
+# the number of intervals per chunk of a ChunkedIntervalSet
+CHUNK_INTERVALS = 1024
+
+
+class IntervalSet:
+    """
+    A normalized set of half-open intervals stored as two sorted offset arrays.
+
+    Overlapping intervals are merged, while touching intervals stay separate,
+    such that adjacent selections or fields keep their identity. Empty
+    intervals (cursors) are kept unless they lie strictly inside another one.
+    All set operations are a single sweep over the sorted arrays.
+    """
+
+    __slots__ = ("begins", "ends")
+
+    def __init__(self, begins: array | None = None, ends: array | None = None):
+        self.begins: array = begins if begins is not None else array("q")
+        self.ends: array = ends if ends is not None else array("q")
+
+    @classmethod
+    def from_pairs(cls, pairs: Iterable[Interval]) -> "IntervalSet":
+        """Build a set from arbitrary (possibly reversed or unsorted) pairs."""
+        return cls._from_sorted(
+            sorted((a, b) if a <= b else (b, a) for a, b in pairs)
+        )
+
+    @classmethod
+    def from_regions(cls, regions: Iterable) -> "IntervalSet":
+        """Build a set from objects with `begin()` and `end()`, e.g. regions."""
+        return cls._from_sorted(sorted((r.begin(), r.end()) for r in regions))
+
+    @classmethod
+    def _from_sorted(cls, pairs: Iterable[Interval]) -> "IntervalSet":
+        begins = array("q")
+        ends = array("q")
+        for begin, end in pairs:
+            if begins:
+                last_begin, last_end = begins[-1], ends[-1]
+                if begin == end:
+                    if last_begin < begin < last_end or (
+                        begin == last_begin and end == last_end
+                    ):
+                        continue
+                elif begin < last_end:
+                    if end > last_end:
+                        ends[-1] = end
+                    continue
+            begins.append(begin)
+            ends.append(end)
+        return cls(begins, ends)
+
+    def __len__(self) -> int:
+        return len(self.begins)
+
+    def __bool__(self) -> bool:
+        return bool(self.begins)
+
+    def __iter__(self) -> Iterator[Interval]:
+        return zip(self.begins, self.ends)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, IntervalSet):
+            return NotImplemented
+        return self.begins == other.begins and self.ends == other.ends
+
+    def __repr__(self) -> str:
+        return f"IntervalSet({list(self)!r})"
+
+    def union(self, other: "IntervalSet") -> "IntervalSet":
+        return self._from_sorted(_merge(self, other))
+
+    def difference(self, other: "IntervalSet") -> "IntervalSet":
+        """
+        Remove every interval of `other` from this set. An empty interval of
+        `other` splits an interval it lies in, and an empty interval of this
+        set is dropped if it touches any interval of `other`.
+        """
+        begins = array("q")
+        ends = array("q")
+        cut_begins, cut_ends = other.begins, other.ends
+        count = len(cut_begins)
+        j = 0
+        for begin, end in zip(self.begins, self.ends):
+            while j < count and cut_ends[j] < begin:
+                j += 1
+            current = begin
+            hit = False
+            k = j
+            while k < count and cut_begins[k] <= end:
+                hit = True
+                if cut_begins[k] > current:
+                    begins.append(current)
+                    ends.append(cut_begins[k])
+                if cut_ends[k] > current:
+                    current = cut_ends[k]
+                k += 1
+            if current < end or not hit:
+                begins.append(current)
+                ends.append(end)
+        return IntervalSet(begins, ends)
+
+    def intersection(self, other: "IntervalSet") -> "IntervalSet":
+        """The overlapping parts of both sets, empty intervals never overlap."""
+        begins = array("q")
+        ends = array("q")
+        a_begins, a_ends = self.begins, self.ends
+        b_begins, b_ends = other.begins, other.ends
+        a_count, b_count = len(a_begins), len(b_begins)
+        i = j = 0
+        while i < a_count and j < b_count:
+            a_end, b_end = a_ends[i], b_ends[j]
+            begin = a_begins[i] if a_begins[i] > b_begins[j] else b_begins[j]
+            end = a_end if a_end < b_end else b_end
+            if begin < end:
+                begins.append(begin)
+                ends.append(end)
+            if a_end < b_end:
+                i += 1
+            else:
+                j += 1
+        return IntervalSet(begins, ends)
+
+    def symmetric_difference(self, other: "IntervalSet") -> "IntervalSet":
+        return self.union(other).difference(self.intersection(other))
+
+    def replaced(self, begin: int, end: int, length: int) -> "IntervalSet":
+        """
+        Follow an edit, which replaced the text between `begin` and `end`
+        with `length` characters. Intervals ending before the edit are
+        untouched, the ones behind it are shifted. Starts inside the replaced
+        text move behind the new text, ends inside of it move to its end.
+        An insertion at the end of an interval does not extend it.
+        """
+        delta = length - (end - begin)
+        first = bisect_left(self.ends, begin)
+        begins = self.begins[:first]
+        ends = self.ends[:first]
+        pairs = []
+        for start, stop in zip(self.begins[first:], self.ends[first:]):
+            if start >= end:
+                start += delta
+            elif start >= begin:
+                start = begin + length
+            if stop > end:
+                stop += delta
+            elif stop > begin:
+                stop = begin + length
+            pairs.append((start, stop if stop > start else start))
+        result = self._from_sorted(pairs)
+        begins.extend(result.begins)
+        ends.extend(result.ends)
+        return IntervalSet(begins, ends)
+
+    def without_empty(self) -> "IntervalSet":
+        begins = array("q")
+        ends = array("q")
+        for begin, end in zip(self.begins, self.ends):
+            if begin != end:
+                begins.append(begin)
+                ends.append(end)
+        return IntervalSet(begins, ends)
+
+
+class ChunkedIntervalSet:
+    """
+    An IntervalSet, which follows the edits of a buffer, split into chunks of
+    consecutive intervals. Like the chunks of the token index, every chunk
+    carries a shift: an edit only rewrites the chunks it touches and shifts
+    the chunks behind it, instead of copying every interval per keystroke.
+    """
+
+    __slots__ = ("chunk_size", "chunks", "shifts")
+
+    def __init__(
+        self, intervals: IntervalSet, chunk_size: int = CHUNK_INTERVALS
+    ) -> None:
+        self.chunk_size: int = chunk_size
+        self.chunks: List[IntervalSet] = self._split(intervals)
+        self.shifts: List[int] = [0] * len(self.chunks)
+
+    def __len__(self) -> int:
+        return sum(len(chunk) for chunk in self.chunks)
+
+    def to_set(self) -> IntervalSet:
+        begins = array("q")
+        ends = array("q")
+        for chunk, shift in zip(self.chunks, self.shifts):
+            if shift:
+                begins.extend(begin + shift for begin in chunk.begins)
+                ends.extend(end + shift for end in chunk.ends)
+            else:
+                begins.extend(chunk.begins)
+                ends.extend(chunk.ends)
+        return IntervalSet(begins, ends)
+
+    def replaced(self, begin: int, end: int, length: int) -> None:
+        """Follow an edit like `IntervalSet.replaced`."""
+        delta = length - (end - begin)
+        shifts = self.shifts
+        touched = []
+        for index, chunk in enumerate(self.chunks):
+            shift = shifts[index]
+            if chunk.ends[-1] + shift < begin:
+                continue
+            if chunk.begins[0] + shift > end:
+                # the chunk is behind the edit and only moves, a chunk starting
+                # at its end is rewritten to drop an empty duplicate
+                shifts[index] = shift + delta
+            else:
+                touched.append(index)
+        if not touched:
+            return
+
+        first, last = touched[0], touched[-1]
+        begins = array("q")
+        ends = array("q")
+        for index in range(first, last + 1):
+            chunk, shift = self.chunks[index], shifts[index]
+            begins.extend(value + shift for value in chunk.begins)
+            ends.extend(value + shift for value in chunk.ends)
+        chunks = self._split(IntervalSet(begins, ends).replaced(begin, end, length))
+        self.chunks[first : last + 1] = chunks
+        shifts[first : last + 1] = [0] * len(chunks)
+
+    def _split(self, intervals: IntervalSet) -> List[IntervalSet]:
+        size = self.chunk_size
+        begins, ends = intervals.begins, intervals.ends
+        return [
+            IntervalSet(begins[start : start + size], ends[start : start + size])
+            for start in range(0, len(intervals), size)
+        ]
+
+
+def _merge(first: IntervalSet, second: IntervalSet) -> Iterator[Interval]:
+    """Merge the intervals of two sorted sets into one sorted stream."""
+    a, b = iter(first), iter(second)
+    x, y = next(a, None), next(b, None)
+    while x is not None and y is not None:
+        if x <= y:
+            yield x
+            x = next(a, None)
+        else:
+            yield y
+            y = next(b, None)
+    if x is not None:
+        yield x
+        yield from a
+    if y is not None:
+        yield y
+        yield from b
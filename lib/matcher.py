@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import re
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+Span = Tuple[int, int]
+
+# escapes, which Python lacks or reads differently from Oniguruma
+_ONIGURUMA_ESCAPES = frozenset(
+    ("A", "G", "h", "H", "k", "g", "K", "p", "P", "Q", "R", "X", "z", "Z", "x{")
+)
+# named and atomic groups, absent operators, posix brackets and possessive
+# quantifiers, which are searched for in the expression without its escapes
+_ONIGURUMA_SYNTAX = re.compile(r"\(\?(?:<(?![=!])|[>~])|\[\[:|[*+?}]\+")
+
+
+class Pattern(NamedTuple):
+    expression: str
+    subtractive: bool = False
+
+    @classmethod
+    def from_arg(
+        cls, arg: Union[str, Dict[str, Any]], subtractive: bool = False
+    ) -> "Pattern":
+        """Build a pattern from a command argument (a string or a dict)."""
+        if isinstance(arg, str):
+            return cls(arg, subtractive)
+        return cls(arg["expression"], arg.get("subtractive", subtractive))
+
+
+def parse_expressions(value: str, separator: str, subtractive: bool) -> List[Pattern]:
+    """
+    Split the input of the expression handler into patterns.
+
+    If there are several parts, each may be prefixed with `+` (additive) or
+    `-` (subtractive), otherwise it inherits the operation of the command.
+    """
+    parts = value.split(separator) if separator else [value]
+    patterns = []
+    for part in parts:
+        if not part:
+            continue
+        if len(parts) > 1 and part[0] in "+-" and len(part) > 1:
+            patterns.append(Pattern(part[1:], part[0] == "-"))
+        else:
+            patterns.append(Pattern(part, subtractive))
+    return patterns
+
+
+def is_portable(expression: str) -> bool:
+    """Whether Python's `re` reads the expression like Sublime's Oniguruma."""
+    for match in re.finditer(r"\\(x\{|.)", expression, re.DOTALL):
+        if match.group(1) in _ONIGURUMA_ESCAPES:
+            return False
+    plain = re.sub(r"\\.", "", expression, flags=re.DOTALL)
+    return _ONIGURUMA_SYNTAX.search(plain) is None
+
+
+class MultiPattern:
+    """
+    Several expressions matched over the same text, which is extracted once
+    for all of them. Every expression is matched on its own, as `find_all`
+    would, so the matches of different expressions may overlap, e.g. `-foobar`
+    also finds the text which `foo` matched.
+
+    An expression, which Python's `re` doesn't read like Sublime's Oniguruma,
+    is rejected with `re.error`, such that the caller falls back to `find_all`.
+    """
+
+    def __init__(self, patterns: Sequence[Pattern], case: bool = True) -> None:
+        self.patterns: Tuple[Pattern, ...] = tuple(patterns)
+        flags = re.MULTILINE | (0 if case else re.IGNORECASE)
+        for pattern in self.patterns:
+            if not is_portable(pattern.expression):
+                raise re.error(f"not portable: {pattern.expression}")
+        self.regexes: List[re.Pattern] = [
+            re.compile(pattern.expression, flags) for pattern in self.patterns
+        ]
+
+    def scan(self, text: str, offset: int = 0) -> List[List[Span]]:
+        """Return the spans of every pattern, shifted by `offset`."""
+        return [
+            [(match.start() + offset, match.end() + offset) for match in matches]
+            for matches in (regex.finditer(text) for regex in self.regexes)
+        ]
+
+    def iter_counts(
+        self, texts: Iterable[str], step: int = 100_000
+    ) -> Iterator[List[int]]:
+        """
+        Count the matches of every pattern without building any spans.
+        The running counts are yielded every `step` matches and once at the end.
+        """
+        counts = [0] * len(self.patterns)
+        seen = 0
+        for text in texts:
+            for index, regex in enumerate(self.regexes):
+                for _ in regex.finditer(text):
+                    counts[index] += 1
+                    seen += 1
+                    if not seen % step:
+                        yield counts
+        yield counts
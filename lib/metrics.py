@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import math
+import threading
+from array import array
+from typing import Any, Dict, Iterable, Tuple
+
+# the smallest bucket and the growth between buckets, about 19% per bucket
+_BASE = 2**0.25
+_BUCKETS = 128
+
+
+class Histogram:
+    """
+    Counts values in logarithmic buckets, such that its memory is constant
+    for any number of samples. Percentiles are exact to about one bucket.
+    """
+
+    __slots__ = ("minimum", "counts", "count", "total", "max")
+
+    def __init__(self, minimum: float = 1e-6) -> None:
+        self.minimum: float = minimum
+        self.counts: array = array("q", bytes(8 * _BUCKETS))
+        self.count: int = 0
+        self.total: float = 0.0
+        self.max: float = 0.0
+
+    def add(self, value: float) -> None:
+        if value <= self.minimum:
+            index = 0
+        else:
+            index = min(int(math.log(value / self.minimum, _BASE)) + 1, _BUCKETS - 1)
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, percent: float) -> float:
+        """The upper bound of the bucket, which holds the percentile."""
+        if not self.count:
+            return 0.0
+        rank = math.ceil(self.count * percent / 100) or 1
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.minimum * _BASE**index, self.max)
+        return self.max
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean": self.mean(),
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self.max,
+        }
+
+
+class Metrics:
+    """
+    The latency and the payload size histograms of every operation. Jobs
+    record from worker threads, so every access holds the lock.
+    """
+
+    def __init__(self) -> None:
+        self.latencies: Dict[str, Histogram] = {}
+        self.sizes: Dict[Tuple[str, str], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float, sizes: Dict[str, int] = {}) -> None:
+        with self._lock:
+            self._record(name, seconds, sizes)
+
+    def _record(self, name: str, seconds: float, sizes: Dict[str, int]) -> None:
+        latency = self.latencies.get(name)
+        if latency is None:
+            latency = self.latencies[name] = Histogram()
+        latency.add(seconds)
+        for key, value in sizes.items():
+            histogram = self.sizes.get((name, key))
+            if histogram is None:
+                histogram = self.sizes[(name, key)] = Histogram(minimum=1.0)
+            histogram.add(value)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.latencies.clear()
+            self.sizes.clear()
+
+    def operations(self) -> Iterable[str]:
+        with self._lock:
+            return sorted(self.latencies)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return self._to_dict()
+
+    def _to_dict(self) -> Dict[str, Any]:
+        return {
+            name: {
+                "seconds": self.latencies[name].summary(),
+                "sizes": {
+                    key: histogram.summary()
+                    for (operation, key), histogram in sorted(self.sizes.items())
+                    if operation == name
+                },
+            }
+            for name in sorted(self.latencies)
+        }
@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import re
+from abc import ABC, abstractmethod
+from typing import Iterator, List, Optional, Tuple
+
+# parentheses, quoted literals, /regex/ atoms and bare words
+_TOKEN = re.compile(
+    r'\s*(\(|\)|"(?:[^"\\]|\\.)*"|/(?:[^/\\]|\\.)+/(?=[\s()]|$)|[^\s()]+)'
+)
+_KEYWORDS = ("and", "or", "not")
+
+
+class QueryError(ValueError):
+    pass
+
+
+class Node(ABC):
+    # the relative cost of a match, cheaper operands are checked first
+    cost = 0
+
+    @abstractmethod
+    def match(self, line: str, lowered: str) -> bool:
+        """Whether the line matches, `lowered` is the line in lower case."""
+
+    def required(self) -> Optional[str]:
+        """A literal, which every matching line contains."""
+        return None
+
+
+class Literal(Node):
+    cost = 1
+
+    def __init__(self, text: str) -> None:
+        self.text: str = text.lower()
+
+    def match(self, line: str, lowered: str) -> bool:
+        return self.text in lowered
+
+    def required(self) -> Optional[str]:
+        return self.text
+
+
+class Regex(Node):
+    cost = 4
+
+    def __init__(self, pattern: str) -> None:
+        try:
+            self.pattern = re.compile(pattern, re.IGNORECASE)
+        except re.error as error:
+            raise QueryError(f"invalid regex /{pattern}/: {error}") from None
+
+    def match(self, line: str, lowered: str) -> bool:
+        return self.pattern.search(line) is not None
+
+
+class Not(Node):
+    def __init__(self, operand: Node) -> None:
+        self.operand: Node = operand
+        self.cost = operand.cost + 1
+
+    def match(self, line: str, lowered: str) -> bool:
+        return not self.operand.match(line, lowered)
+
+
+class And(Node):
+    def __init__(self, operands: List[Node]) -> None:
+        self.operands: List[Node] = sorted(operands, key=lambda node: node.cost)
+        self.cost = sum(node.cost for node in operands)
+
+    def match(self, line: str, lowered: str) -> bool:
+        return all(node.match(line, lowered) for node in self.operands)
+
+    def required(self) -> Optional[str]:
+        literals = [node.required() for node in self.operands]
+        return max(filter(None, literals), key=len, default=None)
+
+
+class Or(Node):
+    def __init__(self, operands: List[Node]) -> None:
+        self.operands: List[Node] = sorted(operands, key=lambda node: node.cost)
+        self.cost = sum(node.cost for node in operands)
+
+    def match(self, line: str, lowered: str) -> bool:
+        return any(node.match(line, lowered) for node in self.operands)
+
+
+class Query:
+    """
+    A boolean query over lines, e.g. `error and not healthcheck and (db or
+    cache)`. Terms are bare words, "quoted literals" or /regex/ atoms,
+    adjacent terms are implicitly combined with `and` and the operators
+    themselves are quoted to match them. Matching ignores the case, the
+    regex atoms are Python expressions.
+
+    If every matching line must contain a literal, the text is searched for
+    it and only the lines containing it are checked against the query.
+    """
+
+    def __init__(self, text: str) -> None:
+        self.root: Node = _Parser(text).parse()
+        self.literal: Optional[str] = self.root.required() or None
+
+    def match(self, line: str) -> bool:
+        return self.root.match(line, line.lower())
+
+    def scan(self, text: str, offset: int = 0) -> Iterator[Tuple[int, str]]:
+        """The offset and the text of every matching line of the text."""
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            # the lowered text can't be sliced like the text
+            for start, end in _lines(text, 0):
+                line = text[start:end]
+                if self.match(line):
+                    yield offset + start, line
+            return
+
+        match = self.root.match
+        literal = self.literal
+        if literal is None:
+            for start, end in _lines(text, 0):
+                if match(text[start:end], lowered[start:end]):
+                    yield offset + start, text[start:end]
+            return
+
+        found = lowered.find(literal)
+        while found != -1:
+            start = text.rfind("\n", 0, found) + 1
+            end = text.find("\n", found)
+            if end == -1:
+                end = len(text)
+            if match(text[start:end], lowered[start:end]):
+                yield offset + start, text[start:end]
+            found = lowered.find(literal, end + 1)
+
+
+def _lines(text: str, start: int) -> Iterator[Tuple[int, int]]:
+    while start < len(text):
+        end = text.find("\n", start)
+        if end == -1:
+            end = len(text)
+        yield start, end
+        start = end + 1
+
+
+class _Parser:
+    """A recursive descent parser, `not` binds before `and` before `or`."""
+
+    def __init__(self, text: str) -> None:
+        self.tokens: List[str] = _tokenize(text)
+        self.position = 0
+
+    def parse(self) -> Node:
+        if not self.tokens:
+            raise QueryError("empty query")
+        node = self.parse_or()
+        if self.position < len(self.tokens):
+            raise QueryError(f"unexpected '{self.tokens[self.position]}'")
+        return node
+
+    def peek(self) -> Optional[str]:
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return None
+
+    def accept(self, keyword: str) -> bool:
+        token = self.peek()
+        if token is not None and token.lower() == keyword:
+            self.position += 1
+            return True
+        return False
+
+    def parse_or(self) -> Node:
+        operands = [self.parse_and()]
+        while self.accept("or"):
+            operands.append(self.parse_and())
+        return operands[0] if len(operands) == 1 else Or(operands)
+
+    def parse_and(self) -> Node:
+        operands = [self.parse_not()]
+        while True:
+            if self.accept("and"):
+                operands.append(self.parse_not())
+                continue
+            token = self.peek()
+            if token is None or token == ")" or token.lower() == "or":
+                break
+            operands.append(self.parse_not())
+        return operands[0] if len(operands) == 1 else And(operands)
+
+    def parse_not(self) -> Node:
+        if self.accept("not"):
+            return Not(self.parse_not())
+        return self.parse_atom()
+
+    def parse_atom(self) -> Node:
+        token = self.peek()
+        if token is None:
+            raise QueryError("the query ends with an operator")
+        self.position += 1
+        if token == "(":
+            node = self.parse_or()
+            if not self.accept(")"):
+                raise QueryError("missing ')'")
+            return node
+        if token == ")" or token.lower() in _KEYWORDS:
+            raise QueryError(f"unexpected '{token}'")
+        if len(token) > 1 and token[0] == token[-1] == '"':
+            return Literal(re.sub(r"\\(.)", r"\1", token[1:-1]))
+        if len(token) > 2 and token[0] == token[-1] == "/":
+            return Regex(token[1:-1].replace("\\/", "/"))
+        return Literal(token)
+
+
+def _tokenize(text: str) -> List[str]:
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if match is None:
+            raise QueryError(f"invalid query at {position}")
+        tokens.append(match.group(1))
+        position = match.end()
+    return tokens
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, List, Optional, Tuple
+
+# the load time in ms, above which a warning is printed to the console
+STARTUP_BUDGET_MS = 50.0
+
+
+class ImportTiming:
+    __slots__ = ("name", "depth", "total", "own")
+
+    def __init__(self, name: str, depth: int, total: float, own: float) -> None:
+        self.name: str = name
+        # the number of timed imports, which are executing this import
+        self.depth: int = depth
+        # seconds including the nested imports of the module, and without them
+        self.total: float = total
+        self.own: float = own
+
+
+# the timings of the last load, in import order
+timings: List[ImportTiming] = []
+
+
+class _TimedLoader:
+    """Wraps the loader of a module to time its execution."""
+
+    def __init__(self, loader: Any, finder: "_TimingFinder") -> None:
+        self._loader = loader
+        self._finder = finder
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._loader, name)
+
+    def create_module(self, spec: Any) -> Any:
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module: Any) -> None:
+        self._finder.stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            total = time.perf_counter() - start
+            nested = self._finder.stack.pop()
+            if self._finder.stack:
+                self._finder.stack[-1] += total
+            depth = len(self._finder.stack)
+            timings.append(ImportTiming(module.__name__, depth, total, total - nested))
+
+
+class _TimingFinder:
+    """A meta path finder, which times the modules below a package prefix."""
+
+    def __init__(self, prefix: str) -> None:
+        self.prefix: str = prefix
+        # the time spent in nested imports of the modules being executed
+        self.stack: List[float] = []
+
+    def find_spec(self, fullname: str, path: Any = None, target: Any = None) -> Any:
+        if not fullname.startswith(self.prefix):
+            return None
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                    spec.loader = _TimedLoader(spec.loader, self)
+                return spec
+        return None
+
+
+@contextmanager
+def import_timer(prefix: str) -> Iterator[None]:
+    """Record the import time of every module, whose name starts with `prefix`."""
+    timings.clear()
+    finder = _TimingFinder(prefix)
+    sys.meta_path.insert(0, finder)
+    try:
+        yield
+    finally:
+        sys.meta_path.remove(finder)
+
+    elapsed = total_ms()
+    if elapsed > STARTUP_BUDGET_MS:
+        print(
+            f"{prefix.rstrip('.')}: loading took {elapsed:.1f} ms, "
+            f"above the budget of {STARTUP_BUDGET_MS:.0f} ms"
+        )
+
+
+def total_ms() -> float:
+    """The time of the outermost imports in ms."""
+    return 1000 * sum(timing.total for timing in timings if not timing.depth)
+
+
+def report(limit: Optional[int] = None) -> List[Tuple[str, float, float]]:
+    """The module name, total and own time in ms, slowest module first."""
+    rows = sorted(timings, key=lambda timing: timing.own, reverse=True)
+    return [
+        (timing.name, 1000 * timing.total, 1000 * timing.own)
+        for timing in rows[:limit]
+    ]
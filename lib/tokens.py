@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+TOKEN = re.compile(r"\w+")
+
+# the number of characters after which a chunk ends at the next line break
+CHUNK_SIZE = 1 << 16
+
+
+class _Chunk:
+    """
+    Consecutive lines of the text and their tokens, as two arrays sorted by
+    the word id and then by the offset relative to the start of the chunk.
+    """
+
+    __slots__ = ("id", "start", "length", "ids", "offsets", "dirty")
+
+    def __init__(self, chunk_id: int, start: int, length: int) -> None:
+        self.id: int = chunk_id
+        self.start: int = start
+        self.length: int = length
+        self.ids: array = array("i")
+        self.offsets: array = array("i")
+        self.dirty: bool = True
+
+    def positions(self, word_id: int) -> array:
+        """The relative offsets of the word in the chunk."""
+        return self.offsets[
+            bisect_left(self.ids, word_id) : bisect_right(self.ids, word_id)
+        ]
+
+
+class TokenIndex:
+    """
+    The offsets of every word (`\\w+`) of a text, which is split into chunks of
+    whole lines. Every word maps to the chunks which contain it, such that a
+    lookup only visits those chunks. The offsets inside a chunk are relative
+    to its start, so an edit only re-tokenizes the chunks it touches and
+    shifts the start of the chunks behind it.
+    """
+
+    def __init__(self, chunk_size: int = CHUNK_SIZE) -> None:
+        self.chunk_size: int = chunk_size
+        self.size: int = 0
+        self.vocabulary: Dict[str, int] = {}
+        self.chunks: List[_Chunk] = []
+        # the word id to the ids of the chunks containing it
+        self.postings: Dict[int, Set[int]] = {}
+        self._next_chunk = 0
+
+    def build(self, text: str) -> None:
+        self.size = 0
+        self.chunks = []
+        self.postings = {}
+        self._insert_chunks(0, 0, text)
+        self.size = len(text)
+
+    def replaced(self, begin: int, end: int, length: int) -> None:
+        """
+        Follow an edit, which replaced the text between `begin` and `end`
+        with `length` characters. The touched chunks are merged and marked
+        dirty, they are re-tokenized by `refresh`.
+        """
+        delta = length - (end - begin)
+        self.size += delta
+        touched = [
+            index
+            for index, chunk in enumerate(self.chunks)
+            if chunk.start <= end and begin <= chunk.start + chunk.length
+        ]
+        if not touched:
+            chunk = self._new_chunk(0, self.size)
+            self.chunks.insert(0, chunk)
+            return
+
+        first, last = touched[0], touched[-1]
+        merged = self.chunks[first]
+        merged.length = sum(c.length for c in self.chunks[first : last + 1]) + delta
+        merged.dirty = True
+        for chunk in self.chunks[first + 1 : last + 1]:
+            self._forget(chunk)
+        del self.chunks[first + 1 : last + 1]
+        for chunk in self.chunks[first + 1 :]:
+            chunk.start += delta
+
+    def refresh(self, read: Callable[[int, int], str]) -> None:
+        """Re-tokenize the dirty chunks, `read(begin, end)` returns the text."""
+        index = 0
+        while index < len(self.chunks):
+            chunk = self.chunks[index]
+            if not chunk.dirty:
+                index += 1
+                continue
+            self._forget(chunk)
+            del self.chunks[index]
+            text = read(chunk.start, chunk.start + chunk.length)
+            index += self._insert_chunks(index, chunk.start, text)
+
+    def is_dirty(self) -> bool:
+        return any(chunk.dirty for chunk in self.chunks)
+
+    def occurrences(self, word: str) -> Iterator[int]:
+        """The sorted offsets of the word."""
+        word_id = self.vocabulary.get(word)
+        if word_id is None:
+            return
+        for chunk in self._chunks_of(word_id):
+            start = chunk.start
+            for offset in chunk.positions(word_id):
+                yield start + offset
+
+    def count(self, word: str) -> int:
+        word_id = self.vocabulary.get(word)
+        if word_id is None:
+            return 0
+        return sum(
+            bisect_right(chunk.ids, word_id) - bisect_left(chunk.ids, word_id)
+            for chunk in self._chunks_of(word_id)
+        )
+
+    def next_occurrence(self, word: str, after: int) -> Optional[int]:
+        """The first offset of the word at or after `after`, wrapping around."""
+        word_id = self.vocabulary.get(word)
+        if word_id is None:
+            return None
+        chunks = self._chunks_of(word_id)
+        for chunk in chunks:
+            if chunk.start + chunk.length <= after:
+                continue
+            positions = chunk.positions(word_id)
+            index = bisect_left(positions, after - chunk.start)
+            if index < len(positions):
+                return chunk.start + positions[index]
+        if chunks:
+            return chunks[0].start + chunks[0].positions(word_id)[0]
+        return None
+
+    def _chunks_of(self, word_id: int) -> List[_Chunk]:
+        chunk_ids = self.postings.get(word_id, ())
+        return sorted(
+            (chunk for chunk in self.chunks if chunk.id in chunk_ids),
+            key=lambda chunk: chunk.start,
+        )
+
+    def _new_chunk(self, start: int, length: int) -> _Chunk:
+        self._next_chunk += 1
+        return _Chunk(self._next_chunk, start, length)
+
+    def _insert_chunks(self, index: int, start: int, text: str) -> int:
+        """Split the text at line breaks into tokenized chunks at `index`."""
+        chunks = []
+        for begin, end in _split_lines(text, self.chunk_size):
+            chunk = self._new_chunk(start + begin, end - begin)
+            self._tokenize(chunk, text[begin:end])
+            chunks.append(chunk)
+        self.chunks[index:index] = chunks
+        return len(chunks)
+
+    def _tokenize(self, chunk: _Chunk, text: str) -> None:
+        positions: Dict[int, List[int]] = {}
+        vocabulary = self.vocabulary
+        for match in TOKEN.finditer(text):
+            word = match.group()
+            word_id = vocabulary.get(word)
+            if word_id is None:
+                word_id = vocabulary[word] = len(vocabulary)
+            offsets = positions.get(word_id)
+            if offsets is None:
+                positions[word_id] = [match.start()]
+            else:
+                offsets.append(match.start())
+
+        for word_id in sorted(positions):
+            offsets = positions[word_id]
+            chunk.ids.extend([word_id] * len(offsets))
+            chunk.offsets.extend(offsets)
+            self.postings.setdefault(word_id, set()).add(chunk.id)
+        chunk.dirty = False
+
+    def _forget(self, chunk: _Chunk) -> None:
+        """Remove the chunk from the postings of its words."""
+        for word_id in set(chunk.ids):
+            chunk_ids = self.postings.get(word_id)
+            if chunk_ids is not None:
+                chunk_ids.discard(chunk.id)
+                if not chunk_ids:
+                    del self.postings[word_id]
+
+
+def _split_lines(text: str, size: int) -> Iterator[Tuple[int, int]]:
+    """Split the text after the first line break behind every `size` characters."""
+    start = 0
+    while start < len(text):
+        cut = text.find("\n", start + size - 1)
+        end = len(text) if cut == -1 else cut + 1
+        yield start, end
+        start = end
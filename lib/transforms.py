@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+from array import array
+from itertools import accumulate, chain, compress
+from operator import attrgetter, gt, le, lt
+from typing import Iterable, Iterator, Tuple
+
+Pair = Tuple[int, int]
+
+
+class RegionArrays:
+    """
+    A snapshot of a selection as two offset arrays, the anchors (`a`) and the
+    carets (`b`) of its regions, such that the direction of every region is
+    kept. Transforms build new arrays in bulk instead of a region at a time
+    and may share the arrays of their input, which are never modified.
+    """
+
+    __slots__ = ("anchors", "carets")
+
+    def __init__(self, anchors: array | None = None, carets: array | None = None):
+        self.anchors: array = anchors if anchors is not None else array("q")
+        self.carets: array = carets if carets is not None else array("q")
+
+    @classmethod
+    def from_regions(cls, regions: Iterable) -> "RegionArrays":
+        """Snapshot objects with `a` and `b` offsets, e.g. a selection."""
+        flat = array("q", chain.from_iterable(map(attrgetter("a", "b"), regions)))
+        return cls(flat[0::2], flat[1::2])
+
+    @classmethod
+    def from_pairs(cls, pairs: Iterable[Pair]) -> "RegionArrays":
+        flat = array("q", chain.from_iterable(pairs))
+        return cls(flat[0::2], flat[1::2])
+
+    def __len__(self) -> int:
+        return len(self.anchors)
+
+    def __iter__(self) -> Iterator[Pair]:
+        return zip(self.anchors, self.carets)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, RegionArrays):
+            return NotImplemented
+        return self.anchors == other.anchors and self.carets == other.carets
+
+    def __repr__(self) -> str:
+        return f"RegionArrays({list(self)!r})"
+
+    def begins(self) -> array:
+        if all(map(le, self.anchors, self.carets)):
+            return self.anchors
+        if all(map(le, self.carets, self.anchors)):
+            return self.carets
+        return array("q", [a if a < b else b for a, b in self])
+
+    def ends(self) -> array:
+        if all(map(le, self.anchors, self.carets)):
+            return self.carets
+        if all(map(le, self.carets, self.anchors)):
+            return self.anchors
+        return array("q", [b if a < b else a for a, b in self])
+
+    def is_normalized(self) -> bool:
+        """Whether every region is forward and not empty."""
+        return all(map(lt, self.anchors, self.carets))
+
+
+def normalize(regions: RegionArrays) -> RegionArrays:
+    """Point every region forward, its caret at its end."""
+    return RegionArrays(regions.begins(), regions.ends())
+
+
+def invert(regions: RegionArrays) -> RegionArrays:
+    """Swap the anchor and the caret of every region."""
+    return RegionArrays(regions.carets, regions.anchors)
+
+
+def toggle(regions: RegionArrays) -> RegionArrays:
+    """Normalize the regions, or invert them if they already are."""
+    return invert(regions) if regions.is_normalized() else normalize(regions)
+
+
+def collapse_start(regions: RegionArrays) -> RegionArrays:
+    begins = regions.begins()
+    return RegionArrays(begins, begins)
+
+
+def collapse_end(regions: RegionArrays) -> RegionArrays:
+    ends = regions.ends()
+    return RegionArrays(ends, ends)
+
+
+def every_nth(regions: RegionArrays, n: int, offset: int = 0) -> RegionArrays:
+    """Keep every `n`-th region, starting with the one at `offset`."""
+    if n < 1 or not 0 <= offset < n:
+        raise ValueError(f"invalid step {n} with offset {offset}")
+    return RegionArrays(regions.anchors[offset::n], regions.carets[offset::n])
+
+
+def dedupe(regions: RegionArrays) -> RegionArrays:
+    """Drop the regions covering the same text as an earlier one."""
+    begins = regions.begins()
+    if all(map(lt, begins, begins[1:])):
+        return regions
+    seen = set()
+    anchors = array("q")
+    carets = array("q")
+    for a, b, span in zip(regions.anchors, regions.carets, zip(begins, regions.ends())):
+        if span not in seen:
+            seen.add(span)
+            anchors.append(a)
+            carets.append(b)
+    return RegionArrays(anchors, carets)
+
+
+def merge(regions: RegionArrays) -> RegionArrays:
+    """
+    Merge overlapping and touching regions into forward regions, unlike the
+    selection itself, which keeps touching regions apart.
+    """
+    begins, ends = regions.begins(), regions.ends()
+    if not all(map(le, begins, begins[1:])):
+        pairs = sorted(zip(begins, ends))
+        begins = array("q", (begin for begin, _ in pairs))
+        ends = array("q", (end for _, end in pairs))
+    if not begins:
+        return RegionArrays()
+    # the furthest end so far, a region starting behind it begins a new one
+    if all(map(le, ends, ends[1:])):
+        reach = ends
+    else:
+        reach = array("q", accumulate(ends, max))
+    if not any(map(le, begins[1:], reach)):
+        return RegionArrays(begins, ends)
+    starts = [0]
+    starts.extend(compress(range(1, len(begins)), map(gt, begins[1:], reach)))
+    stops = [start - 1 for start in starts[1:]]
+    stops.append(len(begins) - 1)
+    return RegionArrays(
+        array("q", map(begins.__getitem__, starts)),
+        array("q", map(reach.__getitem__, stops)),
+    )
+
+
+def split_lines(regions: RegionArrays, texts: Iterable[str]) -> RegionArrays:
+    """
+    Split the regions at their line breaks into forward regions, `texts` are
+    the texts of the regions. Line breaks are not part of the lines and the
+    empty line after a trailing line break is dropped.
+    """
+    begins = array("q")
+    ends = array("q")
+    for begin, end, text in zip(regions.begins(), regions.ends(), texts):
+        start = 0
+        newline = text.find("\n")
+        while newline != -1:
+            begins.append(begin + start)
+            ends.append(begin + newline)
+            start = newline + 1
+            newline = text.find("\n", start)
+        if start == 0 or begin + start < end:
+            begins.append(begin + start)
+            ends.append(end)
+    return RegionArrays(begins, ends)
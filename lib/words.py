@@ -1,30 +1,90 @@
-import os
 import random
-from typing import List
+from array import array
+from typing import Callable, Collection, Optional, Set
 
-import sublime
+PACKAGE_NAME = __package__.partition(".")[0]
+WORDS_RESOURCE = f"Packages/{PACKAGE_NAME}/lib/words.list"
 
+# random names to try, before a numeric suffix guarantees a unique name
+MAX_ATTEMPTS = 16
 
-def load_words_from_file(
-    filename: str = os.path.join(
-        sublime.packages_path(), "BufferUtils", "lib", "words.list"
-    ),
-) -> List[str]:
-    """Load words from the specified file."""
-    with open(filename, "r") as file:
-        return [word.strip() for word in file.readlines()]
 
+def load_words_from_resource() -> str:
+    """Load the word list through the resource API, also inside a .sublime-package."""
+    import sublime
 
-def generate_random_words(num_words: int = 1, word_list: List[str] = []) -> str:
-    """Generate a random sequence of words joined by `-`."""
-    if not word_list or num_words <= 0:
-        return ""
+    return sublime.load_resource(WORDS_RESOURCE)
 
-    chosen_words = random.sample(word_list, min(num_words, len(word_list)))
-    return "-".join(chosen_words)
 
+class BufferNameGenerator:
+    """
+    Random buffer names of one to three words, which are unique among the
+    names handed out and still alive.
 
-def get_buffer_name() -> str:
-    words = load_words_from_file()
-    num_of_words = random.randint(1, 3)  # Randomly choose between 1 and 3 words
-    return generate_random_words(num_of_words, words)
+    The word list is loaded once on first use and kept as a single string
+    with an array of line offsets, instead of a list of thousands of strings.
+    """
+
+    def __init__(self, loader: Callable[[], str] = load_words_from_resource) -> None:
+        self._loader: Callable[[], str] = loader
+        self._text: Optional[str] = None
+        self._starts: array = array("L")
+        self.live: Set[str] = set()
+
+    def _load(self) -> None:
+        words = (line.strip() for line in self._loader().splitlines())
+        text = "\n".join(word for word in words if word)
+        starts = array("L", [0])
+        position = text.find("\n")
+        while position != -1:
+            starts.append(position + 1)
+            position = text.find("\n", position + 1)
+        starts.append(len(text) + 1)
+        self._text, self._starts = text, starts
+
+    def __len__(self) -> int:
+        if self._text is None:
+            self._load()
+        return len(self._starts) - 1 if self._text else 0
+
+    def word(self, index: int) -> str:
+        if self._text is None:
+            self._load()
+        return self._text[self._starts[index] : self._starts[index + 1] - 1]
+
+    def generate(self, taken: Collection[str] = ()) -> str:
+        """Generate a name, which is neither alive nor in `taken`."""
+        count = len(self)
+        if not count:
+            return ""
+
+        name = ""
+        for _ in range(MAX_ATTEMPTS):
+            num_words = random.randint(1, 3)  # Randomly choose between 1 and 3 words
+            indices = random.sample(range(count), min(num_words, count))
+            name = "-".join(self.word(index) for index in indices)
+            if name not in self.live and name not in taken:
+                break
+        else:
+            base, suffix = name, 2
+            while name in self.live or name in taken:
+                name = f"{base}-{suffix}"
+                suffix += 1
+
+        self.live.add(name)
+        return name
+
+    def release(self, name: str) -> None:
+        """Make a name available again, e.g. once its view is closed."""
+        self.live.discard(name)
+
+
+_generator = BufferNameGenerator()
+
+
+def get_buffer_name(taken: Collection[str] = ()) -> str:
+    return _generator.generate(taken)
+
+
+def release_buffer_name(name: str) -> None:
+    _generator.release(name)
@@ -5,23 +5,48 @@ from .buffer import (
     BufferUtilsPreserveCaseCommand,
     RgSearchCommand,
 )
-from .filter import BufferUtilsFilterViewOrPanelCommand
+from .filter import (
+    BufferUtilsFilterJumpCommand,
+    BufferUtilsFilterViewOrPanelCommand,
+    FilterResultsListener,
+)
+from .find import CountListener
+from .jobs import plugin_unloaded
+from .large_file import LargeFileListener
 from .listeners import EventListener
+from .metrics import BufferUtilsPerformanceReportCommand
+from .occurrences import BufferUtilsOccurrencesCommand, OccurrenceListener
+from .profiler import BufferUtilsToggleProfilerCommand
+from .registers import BufferUtilsRegisterCommand, RegisterListener
 from .selection import (
     BufferUtilsSelectionFieldsCommand,
     SelectionFieldsContext,
 )
-from .syntax import BufferUtilsSetSyntaxCommand
+from .startup import BufferUtilsStartupReportCommand
+from .syntax import BufferUtilsSetSyntaxCommand, SyntaxCatalogListener
 
 __all__ = (
     "BufferUtilsFindRegexCommand",
     "BufferUtilsPreserveCaseCommand",
     "BufferUtilsNormalizeSelectionCommand",
     "BufferUtilsNewFileCommand",
+    "BufferUtilsOccurrencesCommand",
+    "BufferUtilsPerformanceReportCommand",
     "BufferUtilsFilterViewOrPanelCommand",
+    "BufferUtilsFilterJumpCommand",
     "BufferUtilsSelectionFieldsCommand",
+    "BufferUtilsRegisterCommand",
     "BufferUtilsSetSyntaxCommand",
+    "BufferUtilsStartupReportCommand",
+    "BufferUtilsToggleProfilerCommand",
+    "CountListener",
     "EventListener",
+    "FilterResultsListener",
+    "LargeFileListener",
+    "OccurrenceListener",
+    "RegisterListener",
     "SelectionFieldsContext",
+    "SyntaxCatalogListener",
     "RgSearchCommand",
+    "plugin_unloaded",
 )
@@ -1,28 +1,66 @@
 from __future__ import annotations
 
 import html
-import re
-import subprocess
-from typing import Any, Dict, List, Optional, Sequence, Union
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
 
 import sublime
 import sublime_plugin
-from more_itertools import first_true
 
+from ..lib.case import PreserveCase
+from ..lib.intervals import IntervalSet
+from ..lib.matcher import Pattern, is_portable, parse_expressions
 from ..lib.words import get_buffer_name
+from ..lib import transforms
+from ..lib.transforms import RegionArrays
 from .common import BufferUtilsHandler
-from .constants import EXPRESSION_PREVIEW_REGION, LAST_EXPRESSION
-from .enum import Operation
+from .constants import (
+    BUFFER_NAME_SETTING,
+    COUNT_PREVIEW_REGION,
+    COUNT_STATUS_KEY,
+    EXPRESSION_PREVIEW_REGION,
+    EXPRESSION_PREVIEW_SUBTRACTIVE_REGION,
+    LAST_EXPRESSION,
+)
+from .enum import FindScope, Operation, SelectionTransform
+from .find import (
+    clear_count,
+    contained,
+    count_matches,
+    find_patterns,
+    scope_regions,
+)
+from .jobs import Job, executor
+from .large_file import is_large, search_in_job, visible_regions
+from .metrics import instrument, timed
 from .settings import settings
 from .syntax import SyntaxSelectorListInputHandler
-from .utils import Case, MutableView, StringAttributes
+from .utils import MutableView, set_selection, substr_all
 
+# the number of rg result lines between progress reports
+PROGRESS_LINES = 10_000
 
+# the transforms of the selection, which only need its regions
+TRANSFORMS: Dict[SelectionTransform, Callable[[RegionArrays], RegionArrays]] = {
+    SelectionTransform.TOGGLE: transforms.toggle,
+    SelectionTransform.NORMALIZE: transforms.normalize,
+    SelectionTransform.INVERT: transforms.invert,
+    SelectionTransform.COLLAPSE_START: transforms.collapse_start,
+    SelectionTransform.COLLAPSE_END: transforms.collapse_end,
+    SelectionTransform.DEDUPE: transforms.dedupe,
+    SelectionTransform.MERGE: transforms.merge,
+}
+
+
+@instrument
 class BufferUtilsNewFileCommand(BufferUtilsHandler, sublime_plugin.WindowCommand):
     def run(self, syntax: str, **kwargs) -> None:
         view = self.window.new_file(syntax=syntax)
         if settings.buffer_assign_random_name:
-            view.set_name(get_buffer_name())
+            # also unique among the names of the open views
+            taken = {v.name() for w in sublime.windows() for v in w.views()}
+            name = get_buffer_name(taken)
+            view.set_name(name)
+            view.settings().set(BUFFER_NAME_SETTING, name)
 
         if kwargs.get("scratch", False):
             view.set_scratch(True)
@@ -32,8 +70,9 @@ class BufferUtilsNewFileCommand(BufferUtilsHandler, sublime_plugin.WindowCommand
 
 
 class OperationInputHandler(sublime_plugin.ListInputHandler):
-    def __init__(self, view: sublime.View) -> None:
+    def __init__(self, view: sublime.View, args: Dict[str, Any]) -> None:
         self.view: sublime.View = view
+        self.args: Dict[str, Any] = args
 
     def name(self) -> str:
         return "subtractive"
@@ -53,9 +92,10 @@ class OperationInputHandler(sublime_plugin.ListInputHandler):
         ]
 
     def next_input(self, args) -> sublime_plugin.CommandInputHandler:
-        return ExpressionInputHandler(self.view, args)
+        return ExpressionInputHandler(self.view, {**self.args, **args})
 
 
+@instrument
 class ExpressionInputHandler(sublime_plugin.TextInputHandler):
     def __init__(self, view: sublime.View, args) -> None:
         self.view: sublime.View = view
@@ -66,14 +106,18 @@ class ExpressionInputHandler(sublime_plugin.TextInputHandler):
         return self.view.settings().get(LAST_EXPRESSION, "")
 
     def confirm(self, arg):
-        self.view.erase_regions(EXPRESSION_PREVIEW_REGION)
+        self.erase_preview()
         self.view.sel().clear()
         self.view.sel().add_all(self.previous_selections)
         return arg
 
     def preview(self, value: str) -> Optional[sublime.Html]:
-        operation, preview_scope = self.get_operation_and_scope()
-        if operation == Operation.SUBTRACTIVE:
+        patterns = parse_expressions(
+            value, settings.find_pattern_separator, self.is_subtractive()
+        )
+        if all(pattern.subtractive for pattern in patterns):
+            from more_itertools import first_true
+
             if not first_true(
                 self.previous_selections,
                 False,
@@ -84,47 +128,177 @@ class ExpressionInputHandler(sublime_plugin.TextInputHandler):
         if not settings.find_preview:
             return
 
-        if not value:
-            self.view.erase_regions(EXPRESSION_PREVIEW_REGION)
+        if not patterns:
+            self.erase_preview()
             return None
 
         self.view.sel().add_all(self.previous_selections)
-
-        regions = self.view.find_all(value, sublime.IGNORECASE)
-        regions = self.update_selection(regions, operation)
+        large = is_large(self.view)
+        regions = scope_regions(self.view, self.get_scope())
         self.view.sel().clear()
+
+        if settings.find_count_only or large:
+            self.erase_highlights()
+            # only the visible matches are highlighted, all are counted. A
+            # pattern which isn't portable would be found in the whole buffer
+            if large and all(is_portable(p.expression) for p in patterns):
+                matches = find_patterns(
+                    self.view,
+                    patterns,
+                    sublime.IGNORECASE,
+                    regions=visible_regions(self.view, regions),
+                )
+                self.draw_preview(patterns, matches)
+            return self.count_preview(value, patterns, regions)
+
+        if search_in_job(self.view):
+            return self.job_preview(value, patterns, regions)
+
+        matches = find_patterns(
+            self.view, patterns, sublime.IGNORECASE, self.get_scope(), regions
+        )
+        instances = self.draw_preview(patterns, matches)
+        return self.render_preview(
+            value,
+            patterns,
+            [len(regions) for regions in matches],
+            instances,
+            instances + len(self.view.sel()),
+        )
+
+    def job_preview(
+        self,
+        value: str,
+        patterns: List[Pattern],
+        regions: Optional[List[sublime.Region]],
+    ) -> sublime.Html:
+        """
+        Find the matches of a large buffer in a job. They are drawn once found,
+        together with their number in the status bar.
+        """
+        view = self.view
+        scope = self.get_scope()
+
+        def on_done(matches: List[List[sublime.Region]]) -> None:
+            instances = self.draw_preview(patterns, matches)
+            view.set_status(COUNT_STATUS_KEY, f"Matches: {instances}")
+
+        executor.submit(
+            ("find_preview", view.id()),
+            lambda job: find_patterns(
+                view, patterns, sublime.IGNORECASE, scope, regions
+            ),
+            on_done,
+            view,
+        )
+        return self.render_preview(value, patterns, None, None)
+
+    def draw_preview(
+        self, patterns: List[Pattern], matches: List[List[sublime.Region]]
+    ) -> int:
+        """Highlight the matches and return the number of highlighted regions."""
+        additive: List[sublime.Region] = []
+        subtractive: List[sublime.Region] = []
+        for pattern, regions in zip(patterns, matches):
+            if pattern.subtractive:
+                subtractive.extend(
+                    self.update_selection(regions, Operation.SUBTRACTIVE)
+                )
+            else:
+                additive.extend(regions)
+
+        flags = sublime.DRAW_NO_FILL | sublime.PERSISTENT
         self.view.add_regions(
             EXPRESSION_PREVIEW_REGION,
+            additive,
+            settings.find_regex_additive_scope,
+            "",
+            flags,
+        )
+        self.view.add_regions(
+            EXPRESSION_PREVIEW_SUBTRACTIVE_REGION,
+            subtractive,
+            settings.find_regex_subtractive_scope,
+            "",
+            flags,
+        )
+        return len(additive) + len(subtractive)
+
+    def count_preview(
+        self,
+        value: str,
+        patterns: List[Pattern],
+        regions: Optional[List[sublime.Region]],
+    ) -> sublime.Html:
+        """Preview only the number of matches, which are counted in a worker."""
+        self.view.erase_regions(COUNT_PREVIEW_REGION)
+        counts = count_matches(
+            self.view,
+            patterns,
+            sublime.IGNORECASE,
+            self.get_scope(),
             regions,
-            preview_scope,
+            lambda counts: self.annotate_counts(value, patterns, counts),
+        )
+        return self.render_preview(
+            value, patterns, counts, sum(counts) if counts is not None else None
+        )
+
+    def annotate_counts(
+        self, value: str, patterns: List[Pattern], counts: List[int]
+    ) -> None:
+        """
+        The input panel can't be asked for a new preview, so the final counts
+        replace its "counting…" in an annotation of the first visible line.
+        """
+        preview = self.render_preview(value, patterns, counts, sum(counts))
+        self.view.add_regions(
+            COUNT_PREVIEW_REGION,
+            [sublime.Region(self.view.visible_region().begin())],
+            "",
             "",
-            sublime.DRAW_NO_FILL | sublime.PERSISTENT,
+            sublime.HIDDEN,
+            annotations=[preview.data],
         )
 
+    def render_preview(
+        self,
+        value: str,
+        patterns: List[Pattern],
+        counts: Optional[List[int]],
+        instances: Optional[int],
+        selections: Optional[int] = None,
+    ) -> sublime.Html:
+        details = ""
+        if counts is not None and len(patterns) > 1:
+            details = "".join(
+                "<strong>{}</strong> <em>{}</em>: {}<br/>".format(
+                    "-" if pattern.subtractive else "+",
+                    html.escape(pattern.expression),
+                    count,
+                )
+                for pattern, count in zip(patterns, counts)
+            )
+
         return sublime.Html(
             "<strong>Expression:</strong> <em>{}</em><br/>"
+            "{}"
             "<strong>Instances:</strong> <em>{}</em><br/>"
-            "<strong>Selections:</strong> <em>{}</em><br/>".format(
+            "{}".format(
                 html.escape(value),
-                len(self.view.get_regions(EXPRESSION_PREVIEW_REGION)),
-                len(self.view.get_regions(EXPRESSION_PREVIEW_REGION))
-                + len(self.view.sel()),
+                details,
+                "counting…" if instances is None else instances,
+                ""
+                if selections is None
+                else f"<strong>Selections:</strong> <em>{selections}</em><br/>",
             )
         )
 
-    def get_operation_and_scope(self):
-        operation = (
-            Operation.ADDITIVE
-            if not self.args.get("subtractive", False)
-            else Operation.SUBTRACTIVE
-        )
-        scope = (
-            settings.find_regex_additive_scope
-            if operation == Operation.ADDITIVE
-            else settings.find_regex_subtractive_scope
-        )
+    def is_subtractive(self) -> bool:
+        return bool(self.args.get("subtractive", False))
 
-        return operation, scope
+    def get_scope(self) -> FindScope:
+        return FindScope(self.args.get("scope", FindScope.BUFFER.value))
 
     def update_selection(
         self,
@@ -133,91 +307,92 @@ class ExpressionInputHandler(sublime_plugin.TextInputHandler):
     ) -> List[sublime.Region]:
         if operation == Operation.ADDITIVE:
             return regions
-        return [r for r in regions if self.view.sel().contains(r)]
+        return contained(regions, self.previous_selections)
 
-    def cancel(self) -> None:
+    def erase_preview(self) -> None:
+        self.erase_highlights()
+        self.view.erase_regions(COUNT_PREVIEW_REGION)
+        clear_count(self.view)
+
+    def erase_highlights(self) -> None:
+        executor.cancel(("find_preview", self.view.id()))
         self.view.erase_regions(EXPRESSION_PREVIEW_REGION)
+        self.view.erase_regions(EXPRESSION_PREVIEW_SUBTRACTIVE_REGION)
+
+    def cancel(self) -> None:
+        self.erase_preview()
 
         if not settings.find_persist_expression:
             self.view.settings().set(LAST_EXPRESSION, "")
 
 
+@instrument
 class BufferUtilsFindRegexCommand(sublime_plugin.TextCommand):
-    def run(self, _, subtractive: bool, expression: str, case: bool = True) -> None:
+    def run(
+        self,
+        _,
+        subtractive: bool,
+        expression: Union[str, List[Union[str, Dict[str, Any]]]],
+        case: bool = True,
+        scope: str = FindScope.BUFFER.value,
+    ) -> None:
+        """
+        Add or subtract the matches of the expressions to the selection. With
+        the `selection` or `visible` scope only the text of the scope is
+        searched, using Python's `re` instead of Sublime's regex engine. An
+        expression only Sublime's engine reads, e.g. with `\\k<name>`, is
+        searched in the whole buffer and its matches are filtered by the scope.
+        """
+        if isinstance(expression, str):
+            patterns = parse_expressions(
+                expression, settings.find_pattern_separator, subtractive
+            )
+        else:
+            patterns = [Pattern.from_arg(arg, subtractive) for arg in expression]
+        if not patterns:
+            return
+
         flag = sublime.IGNORECASE if not case else 0
-        regions = self.view.find_all(expression, flag)
+        find_scope = FindScope(scope)
+        additive: List[sublime.Region] = []
+        removed: List[sublime.Region] = []
+        for pattern, regions in zip(
+            patterns, find_patterns(self.view, patterns, flag, find_scope)
+        ):
+            (removed if pattern.subtractive else additive).extend(regions)
 
-        self.update_selection(regions, subtractive)
-        self.remove_empty_regions()
+        # find in selection, the matches replace the searched selections
+        replace = find_scope == FindScope.SELECTION and bool(additive)
+        self.update_selection(additive, removed, replace)
 
-        if settings.find_persist_expression:
+        if settings.find_persist_expression and isinstance(expression, str):
             self.view.settings().set(LAST_EXPRESSION, expression)
 
     def update_selection(
-        self, regions: List[sublime.Region], subtractive: bool
+        self,
+        additive: List[sublime.Region],
+        subtractive: List[sublime.Region],
+        replace: bool = False,
     ) -> None:
-        selection = self.view.sel()
-        if subtractive:
-            [selection.subtract(region) for region in regions]
-        else:
-            selection.add_all(regions)
-
-    def remove_empty_regions(self) -> None:
-        for region in self.view.sel():
-            if region.empty():
-                self.view.sel().subtract(region)
+        """
+        Add and subtract the matches and drop empty regions in one sweep,
+        then write the result back to the selection at once. A reversed
+        selection, which passes through unchanged, keeps its direction.
+        """
+        regions = [] if replace else list(self.view.sel())
+        backwards = {(r.b, r.a) for r in regions if r.a > r.b}
+        selection = IntervalSet.from_regions(regions)
+        selection = selection.union(IntervalSet.from_regions(additive))
+        selection = selection.difference(IntervalSet.from_regions(subtractive))
+        set_selection(self.view, selection.without_empty(), backwards)
 
     def input(self, args) -> Union[ExpressionInputHandler, OperationInputHandler]:
         if args.get("subtractive", None):
             return ExpressionInputHandler(self.view, args)
-        return OperationInputHandler(self.view)
-
-
-class PreserveCase:
-    def analyze_string(self, value: str) -> StringAttributes:
-        separators = "-_/. "
-        separator = max(separators, key=value.count)
-
-        if value.count(separator) > 0:
-            groups = value.split(separator)
-        else:
-            separator = ""
-            groups = self._split_by_case(value)
-
-        return StringAttributes(
-            separator, [self._get_case_type(s) for s in groups], groups
-        )
-
-    def _split_by_case(self, value: str) -> List[str]:
-        parts = re.findall(r"[A-Z]?[^A-Z]*", value)
-        return [part for part in parts if part]
-
-    def _get_case_type(self, value: str) -> int:
-        if value.islower():
-            return Case.LOWER
-        elif value.isupper():
-            return Case.UPPER
-        elif value.istitle():
-            return Case.CAPITALIZED
-        return Case.MIXED
-
-    def replace_string_with_case(self, old_string: str, new_strings: List[str]) -> str:
-        old_string_meta = self.analyze_string(old_string)
-        old_cases = old_string_meta.case_types
-
-        for i, current_str in enumerate(new_strings):
-            case_type = old_cases[min(i, len(old_cases) - 1)]
-
-            if case_type == Case.UPPER:
-                new_strings[i] = current_str.upper()
-            elif case_type == Case.LOWER:
-                new_strings[i] = current_str.lower()
-            elif case_type == Case.CAPITALIZED:
-                new_strings[i] = current_str.capitalize()
-
-        return old_string_meta.delimiter.join(new_strings)
+        return OperationInputHandler(self.view, args)
 
 
+@instrument
 class BufferUtilsPreserveCaseCommand(PreserveCase, sublime_plugin.TextCommand):
     def run(self, edit: sublime.Edit, value: str, **kwargs) -> None:
         selections: Sequence[sublime.Region] = [r for r in self.view.sel()]
@@ -235,18 +410,16 @@ class BufferUtilsPreserveCaseCommand(PreserveCase, sublime_plugin.TextCommand):
     def preserve_case(
         self, edit: sublime.Edit, selections: Sequence[sublime.Region], value: str
     ) -> None:
-        offset = 0
-        new_strings = self.analyze_string(value).groups
-
-        for region in selections:
-            adjusted_region = sublime.Region(
-                region.begin() + offset, region.end() + offset
-            )
-            current_str = self.view.substr(adjusted_region)
-            new_str = self.replace_string_with_case(current_str, new_strings)
+        regions = [region for region in selections if not region.empty()]
+        old_strings = substr_all(self.view, regions)
+        new_strings = self.replace_all(old_strings, value)
 
-            self.view.replace(edit, adjusted_region, new_str)
-            offset += len(new_str) - len(current_str)
+        # replace back to front, such that no offsets need to be tracked
+        for region, old_string, new_string in reversed(
+            list(zip(regions, old_strings, new_strings))
+        ):
+            if new_string != old_string:
+                self.view.replace(edit, region, new_string)
 
 
 class PreserveCaseInputHandler(sublime_plugin.TextInputHandler):
@@ -264,20 +437,29 @@ class PreserveCaseInputHandler(sublime_plugin.TextInputHandler):
         return arg
 
 
+@instrument
 class BufferUtilsNormalizeSelectionCommand(sublime_plugin.TextCommand):
-    def run(self, _):
+    def run(
+        self,
+        _,
+        operation: str = SelectionTransform.TOGGLE.value,
+        n: int = 2,
+        offset: int = 0,
+    ):
+        """
+        Transform the selection with `operation`, by default it is normalized
+        or inverted if it already is. `n` and `offset` are the step of
+        `every_nth`.
+        """
         selection: sublime.Selection = self.view.sel()
         if not selection:
             return
 
-        regions = (
-            self.normalize(selection)
-            if not self.is_normalized(selection)
-            else self.invert(selection)
-        )
+        snapshot = RegionArrays.from_regions(selection)
+        regions = self.transform(SelectionTransform(operation), snapshot, n, offset)
 
         selection.clear()
-        selection.add_all(regions)
+        selection.add_all([sublime.Region(a, b) for a, b in regions])
 
         if not (
             region := self.find_first_visible_region(
@@ -295,16 +477,20 @@ class BufferUtilsNormalizeSelectionCommand(sublime_plugin.TextCommand):
             None,
         )
 
-    def normalize(self, regions: sublime.Selection) -> List[sublime.Region]:
-        return [sublime.Region(*sorted((region.a, region.b))) for region in regions]
-
-    def invert(self, regions: sublime.Selection) -> List[sublime.Region]:
-        return [sublime.Region(r.b, r.a) if r.a < r.b else r for r in regions]
-
-    def is_normalized(self, regions: sublime.Selection) -> bool:
-        return all(r.a < r.b for r in regions)
+    def transform(
+        self, operation: SelectionTransform, regions: RegionArrays, n: int, offset: int
+    ) -> RegionArrays:
+        if operation == SelectionTransform.SPLIT_LINES:
+            spans = [
+                sublime.Region(a, b) for a, b in zip(regions.begins(), regions.ends())
+            ]
+            return transforms.split_lines(regions, substr_all(self.view, spans))
+        if operation == SelectionTransform.EVERY_NTH:
+            return transforms.every_nth(regions, n, offset)
+        return TRANSFORMS[operation](regions)
 
 
+@instrument
 class RgSearchCommand(sublime_plugin.WindowCommand):
     def run(self):
         self.window.show_input_panel("Search for:", "", self.on_done, None, None)
@@ -319,35 +505,62 @@ class RgSearchCommand(sublime_plugin.WindowCommand):
             sublime.error_message("No folders found in the current window.")
             return
 
-        results = []
-        for folder in folders:
-            results.extend(self.run_rg_search(folder, input))
+        def search(job: Job) -> List[str]:
+            results: List[str] = []
+            for folder in folders:
+                if job.cancelled():
+                    break
+                results.extend(self.run_rg_search(folder, input, job))
+            return results
 
-        if results:
-            self.display_results(results)
-        else:
-            sublime.error_message("No matches found.")
+        def on_search_done(results: List[str]) -> None:
+            if results:
+                self.display_results(results)
+            else:
+                sublime.error_message("No matches found.")
+
+        # a new search of the window supersedes a running one
+        executor.submit(("rg", self.window.id()), search, on_search_done)
+
+    @timed("rg.search", lambda result, *_: {"lines": len(result)})
+    def run_rg_search(self, folder, search_term, job: Optional[Job] = None):
+        import subprocess
+        import tempfile
 
-    def run_rg_search(self, folder, search_term):
         try:
-            # Run the ripgrep command
-            process = subprocess.Popen(
-                ["rg", "--vimgrep", search_term, folder],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-            )
-            output, error = process.communicate()
+            # Run the ripgrep command, errors are collected in a file, such
+            # that the output can be read line by line without blocking
+            with tempfile.TemporaryFile() as errors:
+                process = subprocess.Popen(
+                    ["rg", "--vimgrep", search_term, folder],
+                    stdout=subprocess.PIPE,
+                    stderr=errors,
+                )
+                results = []
+                for line in process.stdout:
+                    results.append(line.decode("utf-8").rstrip("\r\n"))
+                    if job is not None and not len(results) % PROGRESS_LINES:
+                        if job.cancelled():
+                            process.kill()
+                            process.wait()
+                            return []
+                        job.progress(f"Ripgrep: {len(results)} matches in {folder}…")
+                process.stdout.close()
+                process.wait()
+
+                errors.seek(0)
+                error = errors.read()
 
             if error:
                 sublime.error_message(f"Error running ripgrep: {error.decode('utf-8')}")
                 return []
 
-            # Decode output and split into lines
-            return output.decode("utf-8").splitlines()
+            return results
         except Exception as e:
             sublime.error_message(f"Error running ripgrep: {str(e)}")
             return []
 
+    @timed("rg.display", lambda _, self, results: {"lines": len(results)})
     def display_results(self, results):
         # Create a new buffer to display the results
         output_view = self.window.new_file()
@@ -5,6 +5,17 @@ SETTINGS = "BufferUtils.sublime-settings"
 VIEW_OR_PANEL_FILTER_PANEL = "BufferUtils: View Filter"
 
 EXPRESSION_PREVIEW_REGION = "buffer_utils.expression_preview"
+EXPRESSION_PREVIEW_SUBTRACTIVE_REGION = "buffer_utils.expression_preview.subtractive"
 LAST_EXPRESSION = "buffer_utils.last_expression"
 
+COUNT_STATUS_KEY = "buffer_utils.count"
+# the random name generated for a new buffer, released once it is saved or closed
+BUFFER_NAME_SETTING = "buffer_utils.generated_name"
+# annotates the view with the counts of a count-only find preview
+COUNT_PREVIEW_REGION = "buffer_utils.count_preview"
+# the occurrence added last, the next one is searched after it
+LAST_OCCURRENCE_SETTING = "buffer_utils.last_occurrence"
+# set on the filter panel while its lines can be jumped to
+FILTER_RESULTS_SETTING = "buffer_utils.filter_results"
+
 SETTING_PREFIX = "buffer_utils"
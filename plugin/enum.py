@@ -6,6 +6,24 @@ class Operation(Enum):
     SUBTRACTIVE = "subtractive"
 
 
+class FindScope(Enum):
+    BUFFER = "buffer"
+    SELECTION = "selection"
+    VISIBLE = "visible"
+
+
+class SelectionTransform(Enum):
+    TOGGLE = "toggle"
+    NORMALIZE = "normalize"
+    INVERT = "invert"
+    COLLAPSE_START = "collapse_start"
+    COLLAPSE_END = "collapse_end"
+    SPLIT_LINES = "split_lines"
+    EVERY_NTH = "every_nth"
+    DEDUPE = "dedupe"
+    MERGE = "merge"
+
+
 class SelectionMode(Enum):
     PUSH = "push"
     POP = "pop"
@@ -24,3 +42,29 @@ class SelectionMode(Enum):
             SelectionMode.SUBTRACT: False,
             SelectionMode.ADD: False,
         }.get(self, not has_fields)
+
+
+class RegisterAction(Enum):
+    SAVE = "save"
+    LOAD = "load"
+    CLEAR = "clear"
+    UNION = "union"
+    INTERSECT = "intersect"
+    DIFFERENCE = "difference"
+    SYMMETRIC_DIFFERENCE = "symmetric_difference"
+
+
+class OccurrenceAction(Enum):
+    SELECT = "select"
+    COUNT = "count"
+    ADD_NEXT = "add_next"
+
+
+class FilterTarget(Enum):
+    PANEL = "panel"
+    FILE = "file"
+
+
+class FilterSyntax(Enum):
+    REGEX = "regex"
+    QUERY = "query"
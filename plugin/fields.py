@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+from bisect import bisect_right
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import sublime
+
+from .constants import SETTING_PREFIX
+
+_FLAGS = sublime.DRAW_EMPTY | sublime.DRAW_NO_FILL
+
+BUCKET_SIZE = 1024
+BUCKETS_SETTING = f"{SETTING_PREFIX}.field_buckets"
+
+
+class FieldStore:
+    """
+    The stored selection fields of a view, kept sorted in buckets of at most
+    `BUCKET_SIZE` fields, each pushed to the view as its own region key.
+
+    A jump bisects for the next field and only reads and redraws the buckets
+    around the active field, instead of re-pushing every field.
+    """
+
+    _stores: Dict[int, "FieldStore"] = {}
+
+    def __init__(self, view: sublime.View) -> None:
+        self.view: sublime.View = view
+        # the number of fields in front of the active field
+        self.cursor: Optional[int] = None
+        self._cache: Dict[int, List[sublime.Region]] = {}
+        self._change_count: int = view.change_count()
+        # the fields are recovered from the view, e.g. after a plugin reload
+        self.counts: List[int] = [
+            len(view.get_regions(self.key(index)))
+            for index in range(view.settings().get(BUCKETS_SETTING, 0))
+        ]
+        self.total: int = sum(self.counts)
+        # kept up to date by the selection fields command
+        self.has_added_fields: bool = bool(
+            view.get_regions(f"{SETTING_PREFIX}.added_selections")
+        )
+
+    @classmethod
+    def for_view(cls, view: sublime.View) -> "FieldStore":
+        store = cls._stores.get(view.id())
+        if store is None:
+            store = cls._stores[view.id()] = cls(view)
+        return store
+
+    @classmethod
+    def discard(cls, view: sublime.View) -> None:
+        cls._stores.pop(view.id(), None)
+
+    def __bool__(self) -> bool:
+        return self.total > 0
+
+    def key(self, index: int) -> str:
+        return f"{SETTING_PREFIX}.stored_selections.{index}"
+
+    def bucket(self, index: int) -> List[sublime.Region]:
+        """The fields of a bucket, cached until the buffer changes."""
+        change_count = self.view.change_count()
+        if change_count != self._change_count:
+            self._cache.clear()
+            self._change_count = change_count
+        regions = self._cache.get(index)
+        if regions is None:
+            regions = self._cache[index] = self.view.get_regions(self.key(index))
+        return regions
+
+    def get(self) -> List[sublime.Region]:
+        fields: List[sublime.Region] = []
+        for index in range(len(self.counts)):
+            fields.extend(self.bucket(index))
+        return fields
+
+    def set(self, regions: Sequence[sublime.Region], scope: str) -> None:
+        self.erase()
+        regions = sorted(regions, key=lambda region: region.begin())
+        for index, start in enumerate(range(0, len(regions), BUCKET_SIZE)):
+            self._draw(index, regions[start : start + BUCKET_SIZE], scope)
+            self.counts.append(len(self._cache[index]))
+        self.total = len(regions)
+        self.view.settings().set(BUCKETS_SETTING, len(self.counts))
+
+    def erase(self) -> None:
+        for index in range(len(self.counts)):
+            self.view.erase_regions(self.key(index))
+        self.counts = []
+        self.total = 0
+        self.cursor = None
+        self._cache.clear()
+        self.view.settings().erase(BUCKETS_SETTING)
+
+    def jump(
+        self,
+        selections: Sequence[sublime.Region],
+        forward: bool,
+        only_other: bool,
+        cycle: bool,
+        scope: str,
+    ) -> Optional[List[sublime.Region]]:
+        """
+        Store the selections as fields and return the next field as the new
+        selection, `None` if the jump leaves the fields.
+        """
+        pos = self.position(max(sel.end() for sel in selections))
+        inserted = list(selections)
+        total = self.total + len(inserted)
+        if not total:
+            return None
+
+        # the selections are always stored, `only_other` only doesn't skip them
+        step = 0 if only_other else len(inserted)
+        target = pos + (step if forward else -1)
+        if cycle:
+            target %= total
+        if not 0 <= target < total:
+            return None
+
+        changed: Dict[int, List[sublime.Region]] = {}
+        if inserted:
+            index, offset = self.locate(pos, insert=True)
+            regions = changed[index] = list(self.bucket(index))
+            regions[offset:offset] = inserted
+            self.counts[index] += len(inserted)
+
+        index, offset = self.locate(target)
+        regions = changed.get(index) or list(self.bucket(index))
+        field = regions.pop(offset)
+        changed[index] = regions
+        self.counts[index] -= 1
+
+        for index, regions in changed.items():
+            self._draw(index, regions, scope)
+        self.total = total - 1
+        self.cursor = target
+        return [field]
+
+    def position(self, point: int) -> int:
+        """The number of fields, which begin at or before the point."""
+        if self.cursor is not None and self._is_position(self.cursor, point):
+            return self.cursor
+
+        buckets = [index for index, count in enumerate(self.counts) if count]
+        low, high = 0, len(buckets)
+        while low < high:
+            middle = (low + high) // 2
+            if self.bucket(buckets[middle])[0].begin() <= point:
+                low = middle + 1
+            else:
+                high = middle
+        if not low:
+            return 0
+
+        index = buckets[low - 1]
+        begins = [region.begin() for region in self.bucket(index)]
+        return sum(self.counts[:index]) + bisect_right(begins, point)
+
+    def locate(self, pos: int, insert: bool = False) -> Tuple[int, int]:
+        """The bucket and the offset in it of the field at `pos`."""
+        if not self.counts:
+            self.counts.append(0)
+            self.view.settings().set(BUCKETS_SETTING, 1)
+        for index, count in enumerate(self.counts):
+            if pos < count or (insert and pos == count):
+                return index, pos
+            pos -= count
+        raise IndexError("field position out of range")
+
+    def _is_position(self, pos: int, point: int) -> bool:
+        """Whether `pos` fields begin at or before the point."""
+        if not 0 <= pos <= self.total:
+            return False
+        if pos > 0 and self._field(pos - 1).begin() > point:
+            return False
+        return pos == self.total or self._field(pos).begin() > point
+
+    def _field(self, pos: int) -> sublime.Region:
+        index, offset = self.locate(pos)
+        return self.bucket(index)[offset]
+
+    def _draw(self, index: int, regions: List[sublime.Region], scope: str) -> None:
+        self.view.add_regions(self.key(index), regions, scope=scope, flags=_FLAGS)
+        self._cache[index] = regions
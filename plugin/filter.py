@@ -1,13 +1,190 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Sequence
+import os
+from array import array
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
 
 import sublime
 import sublime_plugin
-from more_itertools import first_true
 
-from .constants import VIEW_OR_PANEL_FILTER_PANEL
-from .utils import MutableView, debounce, get_settings
+from ..lib.matcher import Pattern
+from ..lib.query import Query, QueryError
+from .constants import (
+    COUNT_STATUS_KEY,
+    FILTER_RESULTS_SETTING,
+    VIEW_OR_PANEL_FILTER_PANEL,
+)
+from .enum import FilterSyntax, FilterTarget
+from .find import clear_count, count_matches
+from .jobs import Job, executor
+from .large_file import is_large, preview_debounce
+from .metrics import instrument, timed
+from .settings import settings
+from .utils import MutableView, cache_file, debounce, substr_all
+
+
+Matches = Tuple[int, str, array]
+
+# the number of matches written to an export file at once
+EXPORT_BATCH = 2_000
+# the number of characters read at once, when the lines are matched by a query
+QUERY_CHUNK = 1 << 20
+
+
+class NavigationMap:
+    """The source view and the source offset of every line of a filter panel."""
+
+    __slots__ = ("view_id", "offsets")
+
+    def __init__(self, view_id: int, offsets: array) -> None:
+        self.view_id: int = view_id
+        self.offsets: array = offsets
+
+    def offset(self, row: int) -> Optional[int]:
+        return self.offsets[row] if 0 <= row < len(self.offsets) else None
+
+
+# the navigation maps of the filter panels by their view id
+_navigation: Dict[int, NavigationMap] = {}
+
+
+def query_lines(
+    view: sublime.View, query: Query, job: Optional[Job] = None
+) -> Iterator[Tuple[int, str]]:
+    """
+    The offset and the text of every line of the view matching the query, the
+    view is read in chunks of whole lines.
+    """
+    size = view.size()
+    start = 0
+    while start < size:
+        if job is not None and job.cancelled():
+            return
+        end = min(start + QUERY_CHUNK, size)
+        if end < size:
+            end = min(view.line(end).end() + 1, size)
+        yield from query.scan(view.substr(sublime.Region(start, end)), start)
+        start = end
+
+
+@timed("filter", lambda result, *_: {"matches": result[0]})
+def collect_matches(
+    view: sublime.View,
+    filter_text: str,
+    job: Optional[Job] = None,
+    syntax: FilterSyntax = FilterSyntax.REGEX,
+) -> Matches:
+    """
+    The number of matches, their text, each match ending with a newline, and
+    the source offset of every line of the text.
+    """
+    if syntax == FilterSyntax.QUERY:
+        offsets = array("q")
+        lines = []
+        for offset, line in query_lines(view, Query(filter_text), job):
+            offsets.append(offset)
+            lines.append(line)
+        if job is not None and job.cancelled():
+            return 0, "", array("q")
+        return len(lines), "".join(f"{line}\n" for line in lines), offsets
+
+    regions = view.find_all(filter_text, sublime.IGNORECASE)
+    if job is not None and job.cancelled():
+        return 0, "", array("q")
+    texts = substr_all(view, regions)
+    offsets = array("q", [region.begin() for region in regions])
+    if any("\n" in text[:-1] for text in texts):
+        offsets = array("q")
+        for region, text in zip(regions, texts):
+            offsets.append(region.begin())
+            newline = text.find("\n")
+            while -1 < newline < len(text) - 1:
+                offsets.append(region.begin() + newline + 1)
+                newline = text.find("\n", newline + 1)
+    return (
+        len(regions),
+        "".join(text if text.endswith("\n") else f"{text}\n" for text in texts),
+        offsets,
+    )
+
+
+def match_batches(
+    view: sublime.View, filter_text: str, syntax: FilterSyntax
+) -> Iterator[List[str]]:
+    """The texts of the matches while they are found, `EXPORT_BATCH` at a time."""
+    if syntax == FilterSyntax.QUERY:
+        batch = []
+        for _, line in query_lines(view, Query(filter_text)):
+            batch.append(line)
+            if len(batch) == EXPORT_BATCH:
+                yield batch
+                batch = []
+        yield batch
+        return
+
+    point = 0
+    while point <= view.size():
+        regions = []
+        while len(regions) < EXPORT_BATCH and point <= view.size():
+            region = view.find(filter_text, point, sublime.IGNORECASE)
+            if region.a == -1:
+                point = view.size() + 1
+                break
+            regions.append(region)
+            point = region.end() + 1 if region.empty() else region.end()
+        yield substr_all(view, regions)
+
+
+@timed("filter.export", lambda result, *_: {"matches": result or 0})
+def export_matches(
+    view: sublime.View,
+    filter_text: str,
+    path: str,
+    job: Job,
+    syntax: FilterSyntax = FilterSyntax.REGEX,
+) -> Optional[int]:
+    """
+    Write the matches to `path` while they are found, a batch at a time, and
+    return their number, `None` if the job was cancelled. The file is written
+    next to `path` and only moved there once complete.
+    """
+    partial = f"{path}.part"
+    count = 0
+    complete = False
+    try:
+        with open(partial, "w", encoding="utf-8") as file:
+            for texts in match_batches(view, filter_text, syntax):
+                if job.cancelled():
+                    return None
+                file.write(
+                    "".join(
+                        text if text.endswith("\n") else f"{text}\n" for text in texts
+                    )
+                )
+                count += len(texts)
+                job.progress(f"Exporting matches: {count}…")
+        os.replace(partial, path)
+        complete = True
+    finally:
+        if not complete and os.path.exists(partial):
+            os.remove(partial)
+    return count
+
+
+def filter_syntax(syntax: Optional[str]) -> FilterSyntax:
+    return FilterSyntax(syntax or settings.filter_syntax)
+
+
+def valid_query(filter_text: str, syntax: FilterSyntax) -> bool:
+    """Whether the filter text parses, an invalid query is shown in the status."""
+    if syntax != FilterSyntax.QUERY:
+        return True
+    try:
+        Query(filter_text)
+    except QueryError as error:
+        sublime.status_message(f"Invalid query: {error}")
+        return False
+    return True
 
 
 class FilterViewOrPanel:
@@ -20,11 +197,53 @@ class FilterViewOrPanel:
 
     def close(self) -> None:
         if self.filter_panel:
+            executor.cancel(("filter", self.filter_panel.id()))
+            _navigation.pop(self.filter_panel.id(), None)
             self.filter_panel.close()
 
-    def filter(self, view_or_panel_id: int, filter_text: str) -> int:
+    def filter(
+        self,
+        view_or_panel_id: int,
+        filter_text: str,
+        syntax: FilterSyntax = FilterSyntax.REGEX,
+    ) -> Optional[int]:
+        if not (view := self.prepare(view_or_panel_id, filter_text, syntax)):
+            return None
+
+        count, text, offsets = collect_matches(view, filter_text, None, syntax)
+        self.show_matches(view, filter_text, count, text, offsets)
+        return count
+
+    def filter_async(
+        self,
+        view_or_panel_id: int,
+        filter_text: str,
+        syntax: FilterSyntax = FilterSyntax.REGEX,
+    ) -> None:
+        """Collect the matches in a job, which a newer filter text supersedes."""
+        if not (view := self.prepare(view_or_panel_id, filter_text, syntax)):
+            return
+
+        def on_done(result: Matches) -> None:
+            self.show_matches(view, filter_text, *result)
+            view.set_status(COUNT_STATUS_KEY, f"Matches: {result[0]}")
+
+        executor.submit(
+            ("filter", self.filter_panel.id()),
+            lambda job: collect_matches(view, filter_text, job, syntax),
+            on_done,
+            view,
+        )
+
+    def prepare(
+        self,
+        view_or_panel_id: int,
+        filter_text: str,
+        syntax: FilterSyntax = FilterSyntax.REGEX,
+    ) -> Optional[sublime.View]:
+        """Show the panel and return the view to filter."""
         self.get_panel()
-        if not filter_text:
+        if not filter_text or not valid_query(filter_text, syntax):
             return None
 
         if not (view := self.find_view_or_panel(view_or_panel_id)):
@@ -33,15 +252,24 @@ class FilterViewOrPanel:
         sublime.active_window().run_command(
             "show_panel", {"panel": f"output.{VIEW_OR_PANEL_FILTER_PANEL}"}
         )
-
-        regions = view.find_all(filter_text, sublime.IGNORECASE)
-
+        return view
+
+    def show_matches(
+        self,
+        view: sublime.View,
+        filter_text: str,
+        count: int,
+        text: str,
+        offsets: array,
+    ) -> None:
         with MutableView(self.filter_panel):
             self.filter_panel.assign_syntax(view.syntax().path)
             self.filter_panel.settings().set("word_wrap", False)
+            self.filter_panel.settings().set(FILTER_RESULTS_SETTING, bool(count))
             self.filter_panel.run_command("erase_view")
+            _navigation[self.filter_panel.id()] = NavigationMap(view.id(), offsets)
 
-            if not regions:
+            if not count:
                 self.filter_panel.run_command(
                     "append",
                     {
@@ -49,18 +277,12 @@ class FilterViewOrPanel:
                         "force": True,
                     },
                 )
-                return None
-            for region in regions:
-                text = view.substr(region)
-                self.filter_panel.run_command(
-                    "append",
-                    {
-                        "characters": text if text.endswith("\n") else f"{text}\n",
-                    },
-                )
-        return len(regions)
+                return
+            self.filter_panel.run_command("append", {"characters": text})
 
     def find_view_or_panel(self, view_or_panel_id: str) -> sublime.View | None:
+        from more_itertools import first_true
+
         views: Sequence[sublime.View] = sublime.active_window().views()
         panels: Sequence[sublime.View] = list(
             filter(
@@ -80,21 +302,73 @@ class FilterViewOrPanel:
         )
 
 
+@instrument
 class BufferUtilsFilterViewOrPanelCommand(
     FilterViewOrPanel, sublime_plugin.WindowCommand
 ):
-    def run(self, view_or_panel_id: str, filter_text: str):
-        if get_settings(key=["settings", "filter"]).get("preview", True):
+    def run(
+        self,
+        view_or_panel_id: str,
+        filter_text: str,
+        target: str = FilterTarget.PANEL.value,
+        path: Optional[str] = None,
+        syntax: Optional[str] = None,
+    ):
+        """
+        Filter the lines of the view into the filter panel, or with the `file`
+        target stream them to `path`, by default a file in the cache directory.
+        The filter text is a regex or, with the `query` syntax, a boolean query.
+        """
+        view = self.find_view_or_panel(view_or_panel_id)
+        query_syntax = filter_syntax(syntax)
+        if FilterTarget(target) == FilterTarget.FILE:
+            if (
+                view is not None
+                and filter_text
+                and valid_query(filter_text, query_syntax)
+            ):
+                path = path or cache_file("filter", ".txt")
+                self.export(view, filter_text, path, query_syntax)
+            return
+
+        large = view is not None and is_large(view)
+        if settings.filter_preview and not settings.filter_count_only and not large:
             return
-        self.filter(int(view_or_panel_id), filter_text)
+        if large:
+            self.filter_async(int(view_or_panel_id), filter_text, query_syntax)
+        else:
+            self.filter(int(view_or_panel_id), filter_text, query_syntax)
+
+    def export(
+        self,
+        view: sublime.View,
+        filter_text: str,
+        path: str,
+        syntax: FilterSyntax = FilterSyntax.REGEX,
+    ) -> None:
+        def work(job: Job) -> Optional[int]:
+            try:
+                return export_matches(view, filter_text, path, job, syntax)
+            except OSError as error:
+                # the partial file is removed, the reason is shown once back
+                message = f"Could not export the matches to {path}: {error}"
+                sublime.set_timeout(lambda: sublime.error_message(message))
+                return None
+
+        def on_done(count: Optional[int]) -> None:
+            if count is not None:
+                sublime.status_message(f"Exported {count} matches to {path}")
+
+        executor.submit(("filter_export", view.id()), work, on_done, view)
 
     def input(self, args: Dict[str, Any]) -> sublime_plugin.ListInputHandler:
-        return BufferUtilsViewAndPanelListInputHandler(self.window)
+        return BufferUtilsViewAndPanelListInputHandler(self.window, args)
 
 
 class BufferUtilsViewAndPanelListInputHandler(sublime_plugin.ListInputHandler):
-    def __init__(self, window: sublime.Window) -> None:
+    def __init__(self, window: sublime.Window, args: Dict[str, Any] = {}) -> None:
         self.window: sublime.Window = window
+        self.args: Dict[str, Any] = args
 
     def name(self) -> str:
         return "view_or_panel_id"
@@ -125,7 +399,7 @@ class BufferUtilsViewAndPanelListInputHandler(sublime_plugin.ListInputHandler):
         return f"Filter View ID: {value}"
 
     def next_input(self, args: Dict[str, Any]) -> sublime_plugin.TextInputHandler:
-        return BufferUtilsFilterInputHandler(args)
+        return BufferUtilsFilterInputHandler({**self.args, **args})
 
 
 class BufferUtilsFilterInputHandler(FilterViewOrPanel, sublime_plugin.TextInputHandler):
@@ -139,15 +413,110 @@ class BufferUtilsFilterInputHandler(FilterViewOrPanel, sublime_plugin.TextInputH
         return ""
 
     def confirm(self, arg) -> Dict[str, Any]:
+        self.clear_count()
         return arg
 
-    @debounce(disabled=FilterViewOrPanel.disable_debounce)
-    def preview(self, value) -> str | sublime.Html | None:
-        if not get_settings(key=["settings", "filter"]).get("preview", False):
-            return None
+    @debounce(
+        lambda self, value: self.preview_debounce(),
+        disabled=FilterViewOrPanel.disable_debounce,
+    )
+    def preview(self, value) -> None:
+        # debounced, so nothing is returned to the input panel and the
+        # counts are shown in the status bar instead
+        if not settings.filter_preview:
+            return
+
+        view = self.find_view_or_panel(self.args["view_or_panel_id"])
+        if (
+            settings.filter_count_only
+            or self.args.get("target") == FilterTarget.FILE.value
+            or (view is not None and is_large(view))
+        ):
+            self.count_preview(value)
+            return
+
+        # the number of matches is shown in the status bar once they are collected
+        self.filter_async(self.args["view_or_panel_id"], value, self.syntax())
 
-        total_matches = self.filter(self.args["view_or_panel_id"], value)
-        return sublime.Html(f"<strong>Instances:</strong> <em>{total_matches}</em>")
+    def count_preview(self, value: str) -> None:
+        """Only count the matches in a worker, the panel is filled on confirm."""
+        if not (view := self.find_view_or_panel(self.args["view_or_panel_id"])):
+            return
+        if not value:
+            clear_count(view)
+            return
+
+        syntax = self.syntax()
+        if syntax == FilterSyntax.QUERY:
+            if valid_query(value, syntax):
+                self.count_query(view, Query(value))
+            return
+
+        # a count which is still running shows up in the status once done
+        counts = count_matches(view, [Pattern(value)], sublime.IGNORECASE)
+        if counts is not None:
+            view.set_status(COUNT_STATUS_KEY, f"Matches: {counts[0]}")
+
+    def count_query(self, view: sublime.View, query: Query) -> None:
+        """Count the matching lines in a job and show their number in the status."""
+
+        def on_done(count: int) -> None:
+            view.set_status(COUNT_STATUS_KEY, f"Matches: {count}")
+
+        executor.submit(
+            ("count", view.id()),
+            lambda job: sum(1 for _ in query_lines(view, query, job)),
+            on_done,
+            view,
+        )
+
+    def syntax(self) -> FilterSyntax:
+        return filter_syntax(self.args.get("syntax"))
+
+    def preview_debounce(self) -> float:
+        return preview_debounce(self.find_view_or_panel(self.args["view_or_panel_id"]))
+
+    def clear_count(self) -> None:
+        if view := self.find_view_or_panel(self.args["view_or_panel_id"]):
+            clear_count(view)
 
     def cancel(self) -> None:
+        self.clear_count()
         self.close()
+
+
+@instrument
+class BufferUtilsFilterJumpCommand(FilterViewOrPanel, sublime_plugin.TextCommand):
+    def run(self, _) -> None:
+        """Jump from the line of a filter panel to its line in the source view."""
+        navigation = _navigation.get(self.view.id())
+        if navigation is None or not self.view.sel():
+            return
+        row, col = self.view.rowcol(self.view.sel()[0].b)
+        offset = navigation.offset(row)
+        source = self.find_view_or_panel(str(navigation.view_id))
+        if offset is None or source is None:
+            sublime.status_message("The source of the filter result is gone")
+            return
+
+        # appending to the source keeps the offsets, other edits may shift them
+        point = min(offset + col, source.size())
+        window = source.window() or sublime.active_window()
+        if source in window.views():
+            window.focus_view(source)
+        source.sel().clear()
+        source.sel().add(point)
+        source.show_at_center(point)
+
+
+class FilterResultsListener(sublime_plugin.EventListener):
+    def on_post_text_command(
+        self, view: sublime.View, command_name: str, args: Optional[Dict[str, Any]]
+    ) -> None:
+        # a double click selects by words
+        if (
+            command_name == "drag_select"
+            and (args or {}).get("by") == "words"
+            and view.settings().get(FILTER_RESULTS_SETTING)
+        ):
+            view.run_command("buffer_utils_filter_jump")
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import re
+from bisect import bisect_right
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import sublime
+import sublime_plugin
+
+from ..lib.matcher import MultiPattern, Pattern
+from .constants import COUNT_STATUS_KEY
+from .enum import FindScope
+from .jobs import Job, executor
+from .metrics import timed, view_sizes
+from .utils import substr_all
+
+
+def scope_regions(
+    view: sublime.View, scope: FindScope
+) -> Optional[List[sublime.Region]]:
+    """The regions to search in, `None` if the whole buffer is searched."""
+    if scope == FindScope.SELECTION:
+        # the selection is already sorted and free of overlaps
+        return [region for region in view.sel() if not region.empty()]
+    if scope == FindScope.VISIBLE:
+        return [view.visible_region()]
+    return None
+
+
+def find_patterns(
+    view: sublime.View,
+    patterns: Sequence[Pattern],
+    flags: int = 0,
+    scope: FindScope = FindScope.BUFFER,
+    regions: Optional[List[sublime.Region]] = None,
+) -> List[List[sublime.Region]]:
+    """
+    Find all matches of every pattern. Several patterns are matched over one
+    snapshot of the buffer, each on its own such that their matches may overlap.
+
+    If the search is scoped, only the text of the scope regions is extracted
+    and matched, so the cost scales with the scope instead of the buffer.
+    Matches can't span two scope regions and `^`/`$` also match at their
+    borders. The scope regions may be passed as `regions`, if they were
+    taken before, e.g. on the main thread.
+
+    Only an unscoped single pattern is found by Sublime's `find_all`, otherwise
+    the snapshot is matched with Python's `re`. An expression which isn't
+    portable between the two, e.g. using `\\k<name>`, falls back to `find_all`
+    over the whole buffer, whose matches are then filtered by the scope.
+    """
+    if regions is None:
+        regions = scope_regions(view, scope)
+    if regions is None and len(patterns) == 1:
+        return [view.find_all(patterns[0].expression, flags)]
+
+    try:
+        matcher = MultiPattern(patterns, case=not flags & sublime.IGNORECASE)
+    except re.error:
+        # not portable to python, fall back to a find_all per pattern
+        found = [view.find_all(pattern.expression, flags) for pattern in patterns]
+        if regions is None:
+            return found
+        return [contained(matches, regions) for matches in found]
+
+    if regions is None:
+        regions = [sublime.Region(0, view.size())]
+    snapshot = zip((region.begin() for region in regions), substr_all(view, regions))
+
+    spans: List[List[Tuple[int, int]]] = [[] for _ in patterns]
+    for offset, text in snapshot:
+        for pattern_spans, chunk in zip(spans, matcher.scan(text, offset)):
+            pattern_spans.extend(chunk)
+    return [[sublime.Region(a, b) for a, b in chunk] for chunk in spans]
+
+
+def contained(
+    matches: List[sublime.Region], regions: List[sublime.Region]
+) -> List[sublime.Region]:
+    """Keep the matches which are inside of the sorted, disjoint regions."""
+    begins = [region.begin() for region in regions]
+    result = []
+    for match in matches:
+        index = bisect_right(begins, match.begin()) - 1
+        if index >= 0 and match.end() <= regions[index].end():
+            result.append(match)
+    return result
+
+
+_counts: Dict[int, Tuple[tuple, List[int]]] = {}
+
+
+def count_matches(
+    view: sublime.View,
+    patterns: Sequence[Pattern],
+    flags: int = 0,
+    scope: FindScope = FindScope.BUFFER,
+    regions: Optional[List[sublime.Region]] = None,
+    on_counted: Optional[Callable[[List[int]], None]] = None,
+) -> Optional[List[int]]:
+    """
+    Return the match count of every pattern if it is already known. The scope
+    regions may be passed as `regions`, as in `find_patterns`.
+
+    Otherwise the matches are counted on a snapshot in a job, without
+    building any regions, and `None` is returned. The running count is shown
+    in the status bar, the final counts are also passed to `on_counted`.
+    A newer request supersedes an older one.
+    """
+    if regions is None:
+        regions = scope_regions(view, scope)
+    # the scope regions change on scrolling or reselecting, not only on edits
+    digest = None if regions is None else hash(tuple((r.a, r.b) for r in regions))
+    key = (view.change_count(), tuple(patterns), flags, scope, digest)
+    cached = _counts.get(view.id())
+    if cached and cached[0] == key:
+        return cached[1]
+
+    def on_done(counts: Optional[List[int]]) -> None:
+        if counts is not None:
+            _counts[view.id()] = (key, counts)
+            view.set_status(COUNT_STATUS_KEY, f"Matches: {sum(counts)}")
+            if on_counted is not None:
+                on_counted(counts)
+
+    executor.submit(
+        ("count", view.id()),
+        lambda job: _count_matches(job, view, patterns, flags, regions),
+        on_done,
+        view,
+    )
+    return None
+
+
+@timed("find.count", lambda _, job, view, *args: view_sizes(None, view))
+def _count_matches(
+    job: Job,
+    view: sublime.View,
+    patterns: Sequence[Pattern],
+    flags: int,
+    regions: Optional[List[sublime.Region]],
+) -> Optional[List[int]]:
+    try:
+        matcher = MultiPattern(patterns, case=not flags & sublime.IGNORECASE)
+    except re.error:
+        counts = []
+        for pattern in patterns:
+            matches = view.find_all(pattern.expression, flags)
+            if regions is not None:
+                matches = contained(matches, regions)
+            counts.append(len(matches))
+    else:
+        if regions is None:
+            regions = [sublime.Region(0, view.size())]
+        counts = []
+        for counts in matcher.iter_counts(substr_all(view, regions)):
+            if job.cancelled():
+                return None
+            job.progress(f"Counting matches: {sum(counts)}…")
+        counts = list(counts)
+    return counts
+
+
+def clear_count(view: sublime.View) -> None:
+    """Cancel a running count and clear its status."""
+    executor.cancel(("count", view.id()))
+    _counts.pop(view.id(), None)
+    view.erase_status(COUNT_STATUS_KEY)
+
+
+class CountListener(sublime_plugin.EventListener):
+    def on_close(self, view: sublime.View) -> None:
+        clear_count(view)
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import threading
+import traceback
+from typing import Any, Callable, Dict, Hashable, Optional, TypeVar
+
+import sublime
+
+from .constants import SETTING_PREFIX
+
+T = TypeVar("T")
+
+JOB_STATUS_KEY = f"{SETTING_PREFIX}.job"
+
+# the number of worker threads shared by all jobs of the package
+MAX_WORKERS = 2
+
+
+class Job:
+    """
+    A unit of background work. The work checks `cancelled()` between its
+    steps and reports its progress to the status bar of its view.
+    """
+
+    __slots__ = ("key", "view", "_cancelled")
+
+    def __init__(self, key: Hashable, view: Optional[sublime.View]) -> None:
+        self.key: Hashable = key
+        self.view: Optional[sublime.View] = view
+        self._cancelled = threading.Event()
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set() or (
+            self.view is not None and not self.view.is_valid()
+        )
+
+    def progress(self, message: str) -> None:
+        if self.cancelled():
+            return
+        if self.view is not None:
+            self.view.set_status(JOB_STATUS_KEY, message)
+        else:
+            sublime.status_message(message)
+
+
+class JobExecutor:
+    """
+    A bounded pool of worker threads. A job supersedes and cancels the
+    running job of the same key, e.g. the previous preview of a view, and its
+    result is passed to `on_done` on the main thread, unless it was cancelled.
+    """
+
+    def __init__(self, max_workers: int = MAX_WORKERS) -> None:
+        self.max_workers: int = max_workers
+        self._jobs: Dict[Hashable, Job] = {}
+        self._lock = threading.Lock()
+        self._pool: Any = None
+
+    def submit(
+        self,
+        key: Hashable,
+        work: Callable[[Job], T],
+        on_done: Optional[Callable[[T], None]] = None,
+        view: Optional[sublime.View] = None,
+    ) -> Job:
+        job = Job(key, view)
+        with self._lock:
+            previous = self._jobs.get(key)
+            if previous is not None:
+                previous.cancel()
+            self._jobs[key] = job
+            if self._pool is None:
+                from concurrent.futures import ThreadPoolExecutor
+
+                self._pool = ThreadPoolExecutor(
+                    self.max_workers, thread_name_prefix=SETTING_PREFIX
+                )
+            self._pool.submit(self._run, job, work, on_done)
+        return job
+
+    def cancel(self, key: Hashable) -> None:
+        with self._lock:
+            job = self._jobs.pop(key, None)
+        if job is not None:
+            job.cancel()
+            self._finish(job)
+
+    def running(self, key: Hashable) -> bool:
+        return key in self._jobs
+
+    def idle(self) -> bool:
+        return not self._jobs
+
+    def shutdown(self) -> None:
+        with self._lock:
+            for job in self._jobs.values():
+                job.cancel()
+            self._jobs.clear()
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False)
+
+    def _run(
+        self, job: Job, work: Callable[[Job], T], on_done: Optional[Callable[[T], None]]
+    ) -> None:
+        # the job is forgotten on every path, unless `done` takes it over
+        handed_over = False
+        try:
+            if job.cancelled():
+                return
+            result = work(job)
+
+            def done() -> None:
+                if not self._release(job) or job.cancelled():
+                    return
+                if on_done is not None:
+                    on_done(result)
+
+            sublime.set_timeout(done)
+            handed_over = True
+        except Exception:
+            traceback.print_exc()
+        finally:
+            if not handed_over:
+                self._release(job)
+
+    def _release(self, job: Job) -> bool:
+        """Forget the job, `False` if a newer job of its key superseded it."""
+        with self._lock:
+            current = self._jobs.get(job.key) is job
+            if current:
+                del self._jobs[job.key]
+        if current:
+            self._finish(job)
+        return current
+
+    def _finish(self, job: Job) -> None:
+        if job.view is not None and job.view.is_valid():
+            job.view.erase_status(JOB_STATUS_KEY)
+
+
+executor = JobExecutor()
+
+
+def plugin_unloaded() -> None:
+    executor.shutdown()
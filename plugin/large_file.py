@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+from typing import List, Optional, Set
+
+import sublime
+import sublime_plugin
+
+from .constants import SETTING_PREFIX
+from .settings import settings
+
+LARGE_FILE_STATUS_KEY = f"{SETTING_PREFIX}.large_file"
+
+# the debounce of live previews outside of the large file mode, in seconds
+PREVIEW_DEBOUNCE = 0.3
+
+_large_views: Set[int] = set()
+
+
+def is_large(view: sublime.View) -> bool:
+    """
+    Whether the live previews of the view run in the large file mode: only
+    counting matches, highlighting the visible ones, no live syntax and a
+    longer debounce. A threshold of 0 disables its check.
+    """
+    max_size = settings.large_file_size
+    max_regions = settings.large_file_regions
+    return (0 < max_size < view.size()) or (0 < max_regions < len(view.sel()))
+
+
+def search_in_job(view: sublime.View) -> bool:
+    """Whether a preview searches the view in a job instead of right away."""
+    return view.size() > settings.large_file_async_preview_size
+
+
+def preview_debounce(view: Optional[sublime.View]) -> float:
+    if view is not None and is_large(view):
+        return settings.large_file_debounce / 1000
+    return PREVIEW_DEBOUNCE
+
+
+def visible_regions(
+    view: sublime.View, regions: Optional[List[sublime.Region]]
+) -> List[sublime.Region]:
+    """Clip the sorted regions, or the whole buffer if `None`, to the viewport."""
+    visible = view.visible_region()
+    if regions is None:
+        return [visible]
+    return [
+        region.intersection(visible)
+        for region in regions
+        if region.intersects(visible)
+    ]
+
+
+def update_status(view: sublime.View) -> None:
+    """Show in the status bar whether the view is in the large file mode."""
+    large = is_large(view)
+    if large == (view.id() in _large_views):
+        return
+    if large:
+        _large_views.add(view.id())
+        view.set_status(LARGE_FILE_STATUS_KEY, "Large file mode")
+    else:
+        _large_views.discard(view.id())
+        view.erase_status(LARGE_FILE_STATUS_KEY)
+
+
+def update_all_statuses() -> None:
+    """Re-check every open view, e.g. once the thresholds changed."""
+    for window in sublime.windows():
+        for view in window.views():
+            update_status(view)
+
+
+settings.subscribe(("settings", "large_file"), update_all_statuses)
+
+
+class LargeFileListener(sublime_plugin.EventListener):
+    def on_load_async(self, view: sublime.View) -> None:
+        update_status(view)
+
+    def on_activated_async(self, view: sublime.View) -> None:
+        update_status(view)
+
+    def on_modified_async(self, view: sublime.View) -> None:
+        update_status(view)
+
+    def on_close(self, view: sublime.View) -> None:
+        _large_views.discard(view.id())
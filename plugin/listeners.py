@@ -5,7 +5,9 @@ from typing import Any, Dict
 import sublime
 import sublime_plugin
 
-from .utils import get_settings
+from ..lib.words import release_buffer_name
+from .constants import BUFFER_NAME_SETTING
+from .settings import settings
 
 
 class EventListener(sublime_plugin.EventListener):
@@ -13,5 +15,18 @@ class EventListener(sublime_plugin.EventListener):
         self, _: sublime.Window, command_name: str, args: Dict[str, Any]
     ):
         if command_name == "new_file":
-            if get_settings(key=["settings", "listeners"]).get("new_file"):
+            if settings.listeners_new_file:
                 return ("buffer_utils_new_file", args)
+
+    def on_post_save(self, view: sublime.View) -> None:
+        self.release_name(view)
+
+    def on_close(self, view: sublime.View) -> None:
+        self.release_name(view)
+
+    def release_name(self, view: sublime.View) -> None:
+        """Release the generated name, even if the view was renamed since."""
+        name = view.settings().get(BUFFER_NAME_SETTING)
+        if name:
+            release_buffer_name(name)
+            view.settings().erase(BUFFER_NAME_SETTING)
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import json
+import time
+from functools import wraps
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+import sublime
+import sublime_plugin
+
+from ..lib.metrics import Metrics
+from .profiler import profiler
+from .utils import cache_file, show_report
+
+T = TypeVar("T")
+
+SizesCallback = Callable[..., Dict[str, int]]
+
+# the methods of commands and input handlers timed by `instrument`, context
+# queries run on every key press and stay untimed
+INSTRUMENTED_METHODS = ("run", "preview")
+
+metrics = Metrics()
+
+
+def timed(
+    name: str, sizes: Optional[SizesCallback] = None
+) -> Callable[[Callable[..., T]], Callable[..., T]]:
+    """
+    Record the latency of every call under `name`. `sizes` is called with the
+    result and the arguments of the call and returns payload sizes to record.
+    While the profiler is active, the call is captured.
+    """
+
+    def decorator(func: Callable[..., T]) -> Callable[..., T]:
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> T:
+            start = time.perf_counter()
+            if profiler.active():
+                result = profiler.capture(name, func, *args, **kwargs)
+            else:
+                result = func(*args, **kwargs)
+            seconds = time.perf_counter() - start
+            try:
+                payload = sizes(result, *args, **kwargs) if sizes else {}
+            except Exception:
+                payload = {}
+            metrics.record(name, seconds, payload)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def view_sizes(_: Any, instance: Any, *args: Any, **kwargs: Any) -> Dict[str, int]:
+    """The buffer bytes and selected regions of the view of the call."""
+    if isinstance(instance, sublime.View):
+        view = instance
+    else:
+        view = getattr(instance, "view", None)
+    if view is None or not view.is_valid():
+        return {}
+    return {"buffer_bytes": view.size(), "regions": len(view.sel())}
+
+
+def instrument(cls: type) -> type:
+    """Time the `INSTRUMENTED_METHODS`, which the class defines itself."""
+    for method in INSTRUMENTED_METHODS:
+        func = cls.__dict__.get(method)
+        if func is not None:
+            name = f"{cls.__name__}.{method}"
+            setattr(cls, method, timed(name, view_sizes)(func))
+    return cls
+
+
+def _format_seconds(seconds: float) -> str:
+    return f"{seconds * 1000:.2f}"
+
+
+class BufferUtilsPerformanceReportCommand(sublime_plugin.WindowCommand):
+    def run(self, export: bool = False, reset: bool = False) -> None:
+        """
+        Show the call counts and latency percentiles of every operation,
+        `export` also writes them as JSON to the cache directory.
+        """
+        lines = [
+            f"{'operation':<48} {'calls':>7} {'p50 ms':>9} {'p95 ms':>9} "
+            f"{'p99 ms':>9} {'max ms':>9}"
+        ]
+        # a snapshot, jobs keep recording while the report is built
+        for name, operation in metrics.to_dict().items():
+            latency = operation["seconds"]
+            lines.append(
+                f"{name:<48} {latency['count']:>7} "
+                f"{_format_seconds(latency['p50']):>9} "
+                f"{_format_seconds(latency['p95']):>9} "
+                f"{_format_seconds(latency['p99']):>9} "
+                f"{_format_seconds(latency['max']):>9}"
+            )
+            for key, size in operation["sizes"].items():
+                lines.append(
+                    f"    {key:<44} {'':>7} {size['p50']:>9.0f} "
+                    f"{size['p95']:>9.0f} {size['p99']:>9.0f} {size['max']:>9.0f}"
+                )
+        if len(lines) == 1:
+            lines.append("No operations recorded yet.")
+
+        if export:
+            lines.extend(("", f"Exported to {self.export()}"))
+
+        show_report(self.window, "BufferUtils Performance", "\n".join(lines))
+
+        if reset:
+            metrics.reset()
+
+    def export(self) -> str:
+        path = cache_file("performance", ".json")
+        with open(path, "w") as file:
+            json.dump(metrics.to_dict(), file, indent=2)
+        return path
+
@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+from typing import List, Optional, Tuple
+
+import sublime
+import sublime_plugin
+
+from ..lib.tokens import TOKEN, TokenIndex
+from .constants import LAST_OCCURRENCE_SETTING
+from .enum import OccurrenceAction
+from .jobs import Job, executor
+from .metrics import instrument
+from .settings import settings
+from .utils import BufferState, closes_buffer
+
+
+class OccurrenceIndex(BufferState):
+    """
+    The token index of a buffer. It is built in a job on its first use and
+    follows the edits of the buffer afterwards, the chunks touched by an edit
+    are only re-tokenized when the index is used again.
+    """
+
+    def __init__(self, buffer: sublime.Buffer) -> None:
+        super().__init__(buffer)
+        self.index: Optional[TokenIndex] = None
+
+    def close(self) -> None:
+        executor.cancel(("occurrences", self.buffer.id()))
+        self.detach()
+
+    def ready(self) -> Optional[TokenIndex]:
+        """The up to date index, or `None` while it is built."""
+        if self.index is None:
+            self.build()
+            return None
+        if self.index.is_dirty():
+            view = self.buffer.primary_view()
+            self.index.refresh(lambda a, b: view.substr(sublime.Region(a, b)))
+        return self.index
+
+    def build(self) -> None:
+        key = ("occurrences", self.buffer.id())
+        if executor.running(key):
+            return
+        view = self.buffer.primary_view()
+
+        def work(job: Job) -> Tuple[int, Optional[TokenIndex]]:
+            job.progress("Indexing words…")
+            change_count = view.change_count()
+            index = TokenIndex()
+            index.build(view.substr(sublime.Region(0, view.size())))
+            if view.change_count() != change_count:
+                return change_count, None
+            return change_count, index
+
+        def on_done(result: Tuple[int, Optional[TokenIndex]]) -> None:
+            change_count, index = result
+            if index is None or change_count != view.change_count():
+                # edited while it was built, before the listener was attached
+                sublime.set_timeout(self.build)
+                return
+            self.index = index
+            self.attach()
+
+        executor.submit(key, work, on_done, view)
+
+    def detach(self) -> None:
+        super().detach()
+        self.index = None
+
+    def on_text_changed(self, changes: List[sublime.TextChange]) -> None:
+        if self.index is None:
+            return
+        for change in changes:
+            self.index.replaced(change.a.pt, change.b.pt, len(change.str))
+
+
+class OccurrenceListener(sublime_plugin.EventListener):
+    def on_close(self, view: sublime.View) -> None:
+        if closes_buffer(view):
+            OccurrenceIndex.discard(view)
+
+
+@instrument
+class BufferUtilsOccurrencesCommand(sublime_plugin.TextCommand):
+    def run(self, _, action: str = OccurrenceAction.SELECT.value) -> None:
+        """
+        Select, count or add the next occurrence of the word at the first
+        selection. The occurrences are looked up in the token index of the
+        buffer, the buffer is searched while the index is not built yet.
+        """
+        selection = self.view.sel()
+        if not selection:
+            return
+        word = self.word_at(selection[0])
+        if word is None:
+            sublime.status_message("No word at the selection")
+            return
+
+        occurrence_action = OccurrenceAction(action)
+        index = (
+            OccurrenceIndex.for_view(self.view).ready()
+            if settings.occurrences_index
+            else None
+        )
+
+        if occurrence_action == OccurrenceAction.ADD_NEXT:
+            self.add_next(word, index)
+            return
+
+        if index is not None:
+            offsets = list(index.occurrences(word))
+        else:
+            offsets = [r.a for r in self.view.find_all(rf"\b{word}\b")]
+
+        if occurrence_action == OccurrenceAction.COUNT:
+            sublime.status_message(f"'{word}': {len(offsets)} occurrences")
+            return
+
+        selection.clear()
+        selection.add_all([sublime.Region(o, o + len(word)) for o in offsets])
+        sublime.status_message(f"Selected {len(offsets)} occurrences of '{word}'")
+
+    def add_next(self, word: str, index: Optional[TokenIndex]) -> None:
+        selection = self.view.sel()
+        if selection[0].empty():
+            # the word at the cursor is the first occurrence
+            region = self.view.word(selection[0])
+            selection.add(region)
+            self.view.settings().set(LAST_OCCURRENCE_SETTING, [region.a, region.b])
+            return
+
+        # continue after the occurrence added last, as find_under_expand does,
+        # such that the occurrences in front of the first one are reached
+        # once the search wrapped around
+        last = self.view.settings().get(LAST_OCCURRENCE_SETTING)
+        if last and selection.contains(sublime.Region(*last)):
+            after = last[1]
+        else:
+            after = selection[-1].end()
+
+        first: Optional[sublime.Region] = None
+        region = self.next_occurrence(word, index, after)
+        while region is not None and selection.contains(region):
+            # skip the selected occurrences until the search went full circle
+            if first is None:
+                first = region
+            elif region == first:
+                region = None
+                break
+            region = self.next_occurrence(word, index, region.end())
+        if region is None:
+            sublime.status_message(f"All occurrences of '{word}' are selected")
+            return
+        selection.add(region)
+        self.view.settings().set(LAST_OCCURRENCE_SETTING, [region.a, region.b])
+        self.view.show(region)
+
+    def next_occurrence(
+        self, word: str, index: Optional[TokenIndex], after: int
+    ) -> Optional[sublime.Region]:
+        """The first occurrence at or after `after`, wrapping around."""
+        if index is not None:
+            offset = index.next_occurrence(word, after)
+            if offset is None:
+                return None
+            return sublime.Region(offset, offset + len(word))
+        found = self.view.find(rf"\b{word}\b", after)
+        if found.a == -1:
+            found = self.view.find(rf"\b{word}\b", 0)
+        return found if found.a != -1 else None
+
+    def word_at(self, region: sublime.Region) -> Optional[str]:
+        if region.empty():
+            region = self.view.word(region)
+        text = self.view.substr(region)
+        return text if TOKEN.fullmatch(text) else None
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import os
+import re
+import threading
+from typing import Any, Callable, List, Optional, TypeVar
+
+import sublime
+import sublime_plugin
+
+from .constants import PACKAGE_NAME
+from .utils import show_report
+
+T = TypeVar("T")
+
+SUMMARY_LINES = 20
+
+
+class Profiler:
+    """
+    Runs the next `remaining` timed operations under cProfile and stores a
+    .pstats file and a text summary of the top functions for each of them.
+    """
+
+    def __init__(self) -> None:
+        self.remaining: int = 0
+        self.directory: Optional[str] = None
+        self.summaries: List[str] = []
+        self._lock = threading.Lock()
+        # the thread, which is profiling, nested operations are not captured
+        self._owner: Optional[int] = None
+
+    def active(self) -> bool:
+        return self.remaining > 0
+
+    def start(self, count: int) -> str:
+        import tempfile
+
+        self.directory = tempfile.mkdtemp(prefix=f"{PACKAGE_NAME}-profile-")
+        self.summaries = []
+        self.remaining = count
+        return self.directory
+
+    def stop(self) -> None:
+        self.remaining = 0
+
+    def capture(
+        self, name: str, func: Callable[..., T], *args: Any, **kwargs: Any
+    ) -> T:
+        with self._lock:
+            captured = bool(self.remaining) and self._owner is None
+            if captured:
+                self.remaining -= 1
+                self._owner = threading.get_ident()
+                index = len(self.summaries) + 1
+                self.summaries.append("")
+        if not captured:
+            return func(*args, **kwargs)
+
+        import cProfile
+
+        profile = cProfile.Profile()
+        try:
+            return profile.runcall(func, *args, **kwargs)
+        finally:
+            with self._lock:
+                self._owner = None
+            self._save(profile, index, name)
+            if not self.remaining:
+                sublime.set_timeout(self.show_summaries)
+
+    def _save(self, profile: Any, index: int, name: str) -> None:
+        import io
+        import pstats
+
+        file_name = re.sub(r"[^\w.-]+", "_", name)
+        base = os.path.join(self.directory or "", f"{index:02d}-{file_name}")
+        profile.dump_stats(f"{base}.pstats")
+
+        stream = io.StringIO()
+        stats = pstats.Stats(profile, stream=stream)
+        stats.sort_stats("cumulative").print_stats(SUMMARY_LINES)
+        summary = f"# {name}\n# {base}.pstats\n{stream.getvalue()}"
+        with open(f"{base}.txt", "w") as file:
+            file.write(summary)
+        self.summaries[index - 1] = summary
+
+    def show_summaries(self) -> None:
+        window = sublime.active_window()
+        if not window or not self.summaries:
+            return
+        text = "\n".join(
+            [f"Profiles in {self.directory}", ""] + [s for s in self.summaries if s]
+        )
+        show_report(window, "BufferUtils Profiles", text)
+
+
+profiler = Profiler()
+
+
+class BufferUtilsToggleProfilerCommand(sublime_plugin.WindowCommand):
+    def run(self, count: int = 5) -> None:
+        """Profile the next `count` operations, or stop a running capture."""
+        if profiler.active():
+            profiler.stop()
+            profiler.show_summaries()
+            return
+        directory = profiler.start(count)
+        sublime.status_message(f"Profiling the next {count} operations to {directory}")
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import html
+from typing import Dict, List, Optional
+
+import sublime
+import sublime_plugin
+
+from ..lib.intervals import ChunkedIntervalSet, IntervalSet
+from .enum import RegisterAction
+from .metrics import instrument
+from .utils import BufferState, closes_buffer, set_selection
+
+
+class RegisterManager(BufferState):
+    """
+    Named selection registers of a buffer. Each register is an IntervalSet,
+    i.e. two compact offset arrays, split into chunks which follow the edits
+    of the buffer without rewriting the whole register per keystroke.
+    """
+
+    def __init__(self, buffer: sublime.Buffer) -> None:
+        super().__init__(buffer)
+        self.registers: Dict[str, ChunkedIntervalSet] = {}
+
+    def get(self, name: str) -> IntervalSet:
+        register = self.registers.get(name)
+        return register.to_set() if register is not None else IntervalSet()
+
+    def count(self, name: str) -> int:
+        register = self.registers.get(name)
+        return len(register) if register is not None else 0
+
+    def set(self, name: str, intervals: IntervalSet) -> None:
+        self.registers[name] = ChunkedIntervalSet(intervals)
+        self.attach()
+
+    def erase(self, name: str) -> None:
+        self.registers.pop(name, None)
+        if not self.registers:
+            self.detach()
+
+    def on_text_changed(self, changes: List[sublime.TextChange]) -> None:
+        for change in changes:
+            begin, end, length = change.a.pt, change.b.pt, len(change.str)
+            for register in self.registers.values():
+                register.replaced(begin, end, length)
+
+
+class RegisterListener(sublime_plugin.EventListener):
+    def on_close(self, view: sublime.View) -> None:
+        if closes_buffer(view):
+            RegisterManager.discard(view)
+
+
+@instrument
+class BufferUtilsRegisterCommand(sublime_plugin.TextCommand):
+    def run(
+        self,
+        _,
+        action: str,
+        register: str,
+        source: Optional[str] = None,
+        target: Optional[str] = None,
+    ) -> None:
+        """
+        Combine the register with the selection, or with the `source` register,
+        and store the result in the selection, or in the `target` register.
+        """
+        register_action = RegisterAction(action)
+        manager = RegisterManager.for_view(self.view)
+
+        if register_action == RegisterAction.CLEAR:
+            manager.erase(register)
+            sublime.status_message(f"Cleared register '{register}'")
+            return
+
+        left = (
+            manager.get(source)
+            if source is not None
+            else IntervalSet.from_regions(self.view.sel())
+        )
+        right = manager.get(register)
+
+        if register_action == RegisterAction.SAVE:
+            manager.set(register, left)
+            sublime.status_message(f"Register '{register}': {len(left)} regions")
+            return
+
+        if register_action == RegisterAction.LOAD:
+            result = right
+        elif register_action == RegisterAction.UNION:
+            result = left.union(right)
+        elif register_action == RegisterAction.INTERSECT:
+            result = left.intersection(right)
+        elif register_action == RegisterAction.DIFFERENCE:
+            result = left.difference(right).without_empty()
+        else:
+            result = left.symmetric_difference(right).without_empty()
+
+        if target is not None:
+            manager.set(target, result)
+            sublime.status_message(f"Register '{target}': {len(result)} regions")
+        elif result:
+            set_selection(self.view, result)
+            self.view.show(self.view.sel()[0])
+        else:
+            sublime.status_message("The result is empty, the selection is kept.")
+
+    def input(self, args) -> sublime_plugin.TextInputHandler:
+        return RegisterInputHandler(self.view)
+
+
+@instrument
+class RegisterInputHandler(sublime_plugin.TextInputHandler):
+    def __init__(self, view: sublime.View) -> None:
+        self.view: sublime.View = view
+
+    def name(self) -> str:
+        return "register"
+
+    def placeholder(self) -> str:
+        return "Register name"
+
+    def initial_text(self) -> str:
+        return "default"
+
+    def preview(self, value: str) -> sublime.Html:
+        manager = RegisterManager.for_view(self.view)
+        names = ", ".join(
+            f"{html.escape(name)} ({len(intervals)})"
+            for name, intervals in sorted(manager.registers.items())
+        )
+        return sublime.Html(
+            f"<strong>Regions:</strong> <em>{manager.count(value)}</em><br/>"
+            f"<strong>Registers:</strong> <em>{names or 'none'}</em>"
+        )
+
+    def validate(self, value: str) -> bool:
+        return bool(value)
@@ -1,20 +1,24 @@
 from __future__ import annotations
 
-from typing import Sequence
+from typing import List, Optional, Sequence
 
 import sublime
 import sublime_plugin
 
+from ..lib.intervals import IntervalSet
 from .constants import SETTING_PREFIX
 from .enum import SelectionMode
+from .fields import FieldStore
+from .metrics import instrument
+from .settings import settings
+from .utils import to_regions
 
 _FLAGS = sublime.DRAW_EMPTY | sublime.DRAW_NO_FILL
 
 
 def get_settings(key: str, default: bool = None):
     """Get the setting specified by the key."""
-    settings = sublime.load_settings("BufferUtils.sublime-settings")
-    return settings.get(key, default)
+    return settings.get(key, default=default)
 
 
 def get_prefixed_settings(key: str, default: bool = None):
@@ -41,21 +45,15 @@ class RegionManager:
         self.view.erase_regions(f"{SETTING_PREFIX}.{key}")
 
     def store_selection_fields(self, regions: Sequence[sublime.Region]):
-        scope_setting = "scope.added_fields" if self.added_fields else "scope.fields"
-        scope = get_prefixed_settings(scope_setting, "comment")
-        key = "added_selections" if self.added_fields else "stored_selections"
-        self.add_regions(key, regions, scope)
+        _set_fields(self.view, regions, self.added_fields)
 
     def restore_selection_fields(self) -> Sequence[sublime.Region]:
-        regions = self.get_regions("stored_selections")
-        if self.added_fields:
-            regions.extend(self.get_regions("added_selections"))
+        regions = _get_fields(self.view, self.added_fields)
         self.erase_fields()
         return regions
 
     def erase_fields(self):
-        self.erase_regions("stored_selections")
-        self.erase_regions("added_selections")
+        _erase_fields(self.view)
 
 
 class SelectionHandler:
@@ -65,13 +63,13 @@ class SelectionHandler:
     only_other: bool
 
     def process_selection(self):
-        region_manager = RegionManager(self.view)
-        has_only_added_fields = not region_manager.get_regions(
-            "stored_selections"
-        ) and get_prefixed_settings("add_separated", True)
+        has_fields = bool(FieldStore.for_view(self.view))
+        has_only_added_fields = not has_fields and get_prefixed_settings(
+            "add_separated", True
+        )
         sel_regions = None
 
-        if self.mode.should_push(bool(region_manager.get_regions("stored_selections"))):
+        if self.mode.should_push(has_fields):
             sel_regions = self._change_selection()
         elif self.mode == SelectionMode.SUBTRACT:
             sel_regions = self._subtract_selection()
@@ -99,8 +97,8 @@ class SelectionHandler:
     def _subtract_selection(self):
         region_manager = RegionManager(self.view)
         sel_regions = list(self.view.sel())
-        pushed_regions = list(
-            _subtract_selection(region_manager.restore_selection_fields(), sel_regions)
+        pushed_regions = _subtract_selection(
+            region_manager.restore_selection_fields(), sel_regions
         )
         region_manager.store_selection_fields(pushed_regions)
         return sel_regions
@@ -109,7 +107,9 @@ class SelectionHandler:
         region_manager = RegionManager(self.view)
         pushed_regions = region_manager.restore_selection_fields()
         sel_regions = list(self.view.sel())
-        region_manager.store_selection_fields(sel_regions + pushed_regions)
+        region_manager.store_selection_fields(
+            _add_selection(pushed_regions, sel_regions)
+        )
         return sel_regions
 
     def _restore_selection(self):
@@ -118,14 +118,15 @@ class SelectionHandler:
 
     def _execute_jump(self):
         region_manager = RegionManager(self.view)
-        regions, pos = _execute_jump(self.view, self.jump_forward, self.only_other)
-        if self.mode == SelectionMode.CYCLE:
-            pos = pos % len(regions)
-        pos_valid = pos == pos % len(regions)
-        if pos_valid:
-            return _change_selection(self.view, regions, pos)
-        else:
+        sel_regions = _execute_jump(
+            self.view,
+            self.jump_forward,
+            self.only_other,
+            self.mode == SelectionMode.CYCLE,
+        )
+        if sel_regions is None:
             return region_manager.restore_selection_fields()
+        return sel_regions
 
 
 def _set_fields(
@@ -134,19 +135,19 @@ def _set_fields(
     added_fields: bool = False,
 ):
     """Set the fields as regions in the view."""
-    # push the fields to the view, kwargs for ST3 and pos args for ST2
     if not added_fields:
-        reg_name = f"{SETTING_PREFIX}.stored_selections"
-        scope_setting = "scope.fields"
-    else:
-        reg_name = f"{SETTING_PREFIX}.added_selections"
-        scope_setting = "scope.added_fields"
-    scope = get_prefixed_settings(scope_setting, "comment")
-    view.add_regions(reg_name, regions, scope=scope, flags=_FLAGS)
+        scope = get_prefixed_settings("scope.fields", "comment")
+        FieldStore.for_view(view).set(regions, scope)
+        return
+    scope = get_prefixed_settings("scope.added_fields", "comment")
+    view.add_regions(
+        f"{SETTING_PREFIX}.added_selections", regions, scope=scope, flags=_FLAGS
+    )
+    FieldStore.for_view(view).has_added_fields = bool(regions)
 
 
 def _get_fields(view: sublime.View, added_fields=True):
-    fields = view.get_regions(f"{SETTING_PREFIX}.stored_selections")
+    fields = FieldStore.for_view(view).get()
     if added_fields:
         fields.extend(view.get_regions(f"{SETTING_PREFIX}.added_selections"))
     return fields
@@ -154,11 +155,12 @@ def _get_fields(view: sublime.View, added_fields=True):
 
 def _erase_added_fields(view: sublime.View):
     view.erase_regions(f"{SETTING_PREFIX}.added_selections")
+    FieldStore.for_view(view).has_added_fields = False
 
 
 def _erase_fields(view: sublime.View):
-    view.erase_regions(f"{SETTING_PREFIX}.stored_selections")
-    view.erase_regions(f"{SETTING_PREFIX}.added_selections")
+    FieldStore.for_view(view).erase()
+    _erase_added_fields(view)
 
 
 def _change_selection(view: sublime.View, regions: Sequence[sublime.Region], pos: int):
@@ -178,50 +180,49 @@ def _restore_selection(view: sublime.View, only_other):
     return sel_regions
 
 
-def _execute_jump(view: sublime.View, jump_forward: bool, only_other: bool):
+def _execute_jump(
+    view: sublime.View, jump_forward: bool, only_other: bool, cycle: bool
+) -> Optional[List[sublime.Region]]:
     """
     Add the selection to the fields and move the selection to the
-    next field.
+    next field. Returns `None` if the jump leaves the fields.
     """
-    regions = _get_fields(view)
-    try:
-        # search for the first field, which is behind the last selection
-        end = max(sel.end() for sel in view.sel())
-        pos = next(i for i, sel in enumerate(regions) if sel.begin() > end)
-    except StopIteration:
-        pos = len(regions)
-    sel_count = 0 if only_other else len(view.sel())
-
-    if sel_count == 1:
-        regions.insert(pos, view.sel()[0])
-    else:
-        regions = regions[:pos] + list(view.sel()) + regions[pos:]
-    delta = sel_count if jump_forward else -1
-    pos = pos + delta
-    return regions, pos
+    store = FieldStore.for_view(view)
+    if store.has_added_fields:
+        # merge the added fields once, such that the jump only touches the store
+        added_regions = view.get_regions(f"{SETTING_PREFIX}.added_selections")
+        _set_fields(view, _add_selection(store.get(), added_regions))
+        _erase_added_fields(view)
+
+    return store.jump(
+        view.sel(),
+        jump_forward,
+        only_other,
+        cycle,
+        get_prefixed_settings("scope.fields", "comment"),
+    )
 
 
 def _subtract_selection(
     pushed_regions: Sequence[sublime.Region], selections: Sequence[sublime.Region]
-):
-    """Subtract the selections from the pushed fields."""
-    for reg in pushed_regions:
-        for sel in selections:
-            if sel.begin() <= reg.end() and reg.begin() <= sel.end():
-                # yield the region from the start of the field to the selection
-                if reg.begin() < sel.begin():
-                    yield sublime.Region(reg.begin(), sel.begin())
-                # update the region to be from the end of the selection to
-                # the end of the field
-                reg = sublime.Region(sel.end(), reg.end())
-                # if the region is not forward, break and don't add it as field
-                if not reg.a < reg.b:
-                    break
-        else:
-            # yield the region as field
-            yield reg
+) -> List[sublime.Region]:
+    """
+    Subtract the selections from the pushed fields. A cursor inside of a field
+    splits it and fields, which are completely covered, are removed.
+    """
+    fields = IntervalSet.from_regions(pushed_regions)
+    return to_regions(fields.difference(IntervalSet.from_regions(selections)))
+
 
+def _add_selection(
+    pushed_regions: Sequence[sublime.Region], selections: Sequence[sublime.Region]
+) -> List[sublime.Region]:
+    """Add the selections to the pushed fields, merging overlapping fields."""
+    fields = IntervalSet.from_regions(pushed_regions)
+    return to_regions(fields.union(IntervalSet.from_regions(selections)))
 
+
+@instrument
 class BufferUtilsSelectionFieldsCommand(sublime_plugin.TextCommand):
     def run(
         self,
@@ -236,15 +237,17 @@ class BufferUtilsSelectionFieldsCommand(sublime_plugin.TextCommand):
             except ValueError:
                 raise ValueError(f"'{mode}' is not a valid SelectionMode")
         view = self.view
-        has_only_added_fields = not _get_fields(
-            view, added_fields=False
-        ) and get_prefixed_settings("add_separated", True)
+        # answered by the store, such that a jump doesn't collect every field
+        store = FieldStore.for_view(view)
+        has_only_added_fields = not store and get_prefixed_settings(
+            "add_separated", True
+        )
 
         # the regions, which should be selected after executing this command
         sel_regions = None
 
         if mode.should_push(
-            bool(_get_fields(view))
+            bool(store) or store.has_added_fields
         ):  # push or initial trigger with anything except pop
             sels = list(view.sel())
             border_pos = 0 if jump_forward else len(sels) - 1
@@ -254,14 +257,16 @@ class BufferUtilsSelectionFieldsCommand(sublime_plugin.TextCommand):
         ):  # subtract selections from the pushed fields
             sel_regions = list(view.sel())
             pushed_regions = _get_fields(view)
-            regions = list(_subtract_selection(pushed_regions, sel_regions))
+            regions = _subtract_selection(pushed_regions, sel_regions)
             _erase_added_fields(view)
             _set_fields(view, regions, added_fields=has_only_added_fields)
         elif mode == SelectionMode.ADD:  # add selections to the pushed fields
             pushed_regions = _get_fields(view)
             sel_regions = list(view.sel())
             _set_fields(
-                view, sel_regions + pushed_regions, added_fields=has_only_added_fields
+                view,
+                _add_selection(pushed_regions, sel_regions),
+                added_fields=has_only_added_fields,
             )
         elif mode == SelectionMode.REMOVE:  # remove pushed fields
             pop_regions = _restore_selection(view, only_other)
@@ -275,17 +280,12 @@ class BufferUtilsSelectionFieldsCommand(sublime_plugin.TextCommand):
         elif mode == SelectionMode.SMART and has_only_added_fields:
             sel_regions = _restore_selection(view, only_other)
         else:  # smart or cycle
-            # execute the jump
-            regions, pos = _execute_jump(view, jump_forward, only_other)
-            # if we are in the cycle mode force the position to be valid
-            if mode == SelectionMode.CYCLE:
-                pos = pos % len(regions)
-            # check whether it is a valid position
-            pos_valid = pos == pos % len(regions)
-            if pos_valid:
-                # move the selection to the new field
-                sel_regions = _change_selection(view, regions, pos)
-            else:
+            # move the selection to the next field, in the cycle mode the
+            # position is always valid
+            sel_regions = _execute_jump(
+                view, jump_forward, only_other, mode == SelectionMode.CYCLE
+            )
+            if sel_regions is None:
                 # if we reached the end restore the selection and
                 # remove the highlight regions
                 sel_regions = _restore_selection(view, only_other)
@@ -297,26 +297,35 @@ class BufferUtilsSelectionFieldsCommand(sublime_plugin.TextCommand):
             view.show(sel_regions[0])
 
 
+_CONTEXT_KEYS = frozenset(
+    (
+        "is_selection_field",
+        "is_selection_field.added_fields",
+        "selection_fields_tab_enabled",
+        "selection_fields_escape_enabled",
+    )
+)
+
+
 class SelectionFieldsContext(sublime_plugin.EventListener):
+    def on_close(self, view: sublime.View) -> None:
+        FieldStore.discard(view)
+
     def on_query_context(self, view, key, operator, operand, match_all):
-        if key not in [
-            "is_selection_field",
-            "is_selection_field.added_fields",
-            "selection_fields_tab_enabled",
-            "selection_fields_escape_enabled",
-        ]:
+        if key not in _CONTEXT_KEYS:
             return False
 
         if key == "is_selection_field":
             # selection field is active if the regions are pushed to the view
-            result = bool(_get_fields(view, added_fields=False))
+            result = bool(FieldStore.for_view(view))
         elif key == "is_selection_field.added_fields":
             # selection field is active if the regions are pushed to the view
             # also if added fields are pushed
-            result = bool(_get_fields(view))
+            store = FieldStore.for_view(view)
+            result = bool(store) or store.has_added_fields
         else:
             # the *_enabled key has the same name in the settings
-            result = get_settings(key, False)
+            result = settings.to_dict().get(key, False)
 
         if operator == sublime.OP_EQUAL:
             result = result == operand
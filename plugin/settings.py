@@ -1,169 +1,248 @@
 from __future__ import annotations
 
-from typing import Any
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, Set, Tuple
 
 import sublime
 
 from .constants import SETTINGS
 
+KeyPath = Tuple[str, ...]
+
+DEFAULT_SETTINGS: Dict[str, Any] = {
+    "selection_fields.scope.fields": "comment",
+    "selection_fields.scope.added_fields": "none",
+    "selection_fields.add_separated": True,
+    "selection_fields_tab_enabled": True,
+    "selection_fields_escape_enabled": True,
+    "settings": {
+        "listeners": {
+            "new_file": True,
+        },
+        "find": {
+            "preview": True,
+            "persist_expression": True,
+            "regex_additive_scope": "region.greenish",
+            "regex_subtractive_scope": "region.redish",
+            "pattern_separator": " ;; ",
+            "count_only": False,
+        },
+        "buffer": {
+            "assign_random_name": False,
+        },
+        "filter": {
+            "preview": True,
+            "disable_debounce": True,
+            "count_only": False,
+            "syntax": "regex",
+        },
+        "syntax": {
+            "preview_max_size": 1_000_000,
+            "preview_delay": 150,
+        },
+        "occurrences": {
+            "index": True,
+        },
+        "large_file": {
+            "size": 50_000_000,
+            "regions": 100_000,
+            "async_preview_size": 1_000_000,
+            "debounce": 1000,
+        },
+    },
+}
+
 
 class Settings:
+    """
+    An immutable snapshot of the merged default and user settings.
+
+    The snapshot is only rebuilt when the settings change, which bumps the
+    `version` and notifies the subscribers of every changed key path.
+    """
+
     def __init__(self):
-        self.default_settings = {
-            "selection_fields.scope.fields": "comment",
-            "selection_fields.scope.added_fields": "none",
-            "selection_fields.add_separated": True,
-            "selection_fields_tab_enabled": True,
-            "selection_fields_escape_enabled": True,
-            "settings": {
-                "listeners": {
-                    "new_file": True,
-                },
-                "find": {
-                    "preview": True,
-                    "persist_expression": True,
-                    "regex_additive_scope": "region.greenish",
-                    "regex_subtractive_scope": "region.redish",
-                },
-                "buffer": {
-                    "assign_random_name": False,
-                },
-                "filter": {"preview": True, "disable_debounce": True},
-            },
-        }
+        self.default_settings: Mapping[str, Any] = _freeze(DEFAULT_SETTINGS)
+        self.version: int = 0
+        self._subscribers: Dict[KeyPath, List[Callable[[], None]]] = {}
         self._settings = sublime.load_settings(SETTINGS)
-        self.settings = self._merge_settings(
-            self.default_settings, self._settings.to_dict()
-        )
+        self.settings: Mapping[str, Any] = self._build()
         self.register_on_change()
 
     def register_on_change(self) -> None:
-        self._settings.add_on_change(
-            SETTINGS,
-            lambda: self._merge_settings(
-                self.default_settings, self._settings.to_dict()
-            ),
-        )
-        return
+        self._settings.add_on_change(SETTINGS, self._on_change)
+
+    def subscribe(self, key: str | KeyPath, callback: Callable[[], None]) -> None:
+        """Call `callback` whenever the setting at the key path changes."""
+        path = (key,) if isinstance(key, str) else tuple(key)
+        self._subscribers.setdefault(path, []).append(callback)
+
+    def unsubscribe(self, key: str | KeyPath, callback: Callable[[], None]) -> None:
+        path = (key,) if isinstance(key, str) else tuple(key)
+        if callback in self._subscribers.get(path, []):
+            self._subscribers[path].remove(callback)
+
+    def get(self, *keys: str, default: Any = None) -> Any:
+        """Look up a nested setting, e.g. `get("settings", "find", "preview")`."""
+        result: Any = self.settings
+        for key in keys:
+            if not isinstance(result, Mapping) or key not in result:
+                return default
+            result = result[key]
+        return result
+
+    def _build(self) -> Mapping[str, Any]:
+        merged = self._merge_settings(DEFAULT_SETTINGS, self._settings.to_dict())
+        return _freeze(merged)
+
+    def _on_change(self) -> None:
+        snapshot = self._build()
+        changed = _changed_paths(self.settings, snapshot)
+        if not changed:
+            return
+
+        self.settings = snapshot
+        self.version += 1
+        for path, callbacks in list(self._subscribers.items()):
+            if any(_related(path, changed_path) for changed_path in changed):
+                for callback in list(callbacks):
+                    callback()
 
     def _merge_settings(
-        self, default: dict[str, Any], user: dict[str, Any] | None
-    ) -> dict[str, Any]:
-        if user is None:
-            return default
-        for key, value in user.items():
-            if isinstance(value, dict) and key in default:
-                default[key] = self._merge_settings(default[key], value)
+        self, default: Mapping[str, Any], user: Mapping[str, Any] | None
+    ) -> Dict[str, Any]:
+        merged = dict(default)
+        for key, value in (user or {}).items():
+            if isinstance(value, Mapping) and isinstance(merged.get(key), Mapping):
+                merged[key] = self._merge_settings(merged[key], value)
             else:
-                default[key] = value
-        return default
+                merged[key] = value
+        return merged
 
     @property
     def selection_fields_scope_fields(self) -> str:
         return self.settings["selection_fields.scope.fields"]
 
-    @selection_fields_scope_fields.setter
-    def selection_fields_scope_fields(self, value: str) -> None:
-        self.settings["selection_fields.scope.fields"] = value
-
     @property
     def selection_fields_scope_added_fields(self) -> str:
         return self.settings["selection_fields.scope.added_fields"]
 
-    @selection_fields_scope_added_fields.setter
-    def selection_fields_scope_added_fields(self, value: str) -> None:
-        self.settings["selection_fields.scope.added_fields"] = value
-
     @property
     def selection_fields_add_separated(self) -> bool:
         return self.settings["selection_fields.add_separated"]
 
-    @selection_fields_add_separated.setter
-    def selection_fields_add_separated(self, value: bool) -> None:
-        self.settings["selection_fields.add_separated"] = value
-
     @property
     def selection_fields_tab_enabled(self) -> bool:
         return self.settings["selection_fields_tab_enabled"]
 
-    @selection_fields_tab_enabled.setter
-    def selection_fields_tab_enabled(self, value: bool) -> None:
-        self.settings["selection_fields_tab_enabled"] = value
-
     @property
     def selection_fields_escape_enabled(self) -> bool:
         return self.settings["selection_fields_escape_enabled"]
 
-    @selection_fields_escape_enabled.setter
-    def selection_fields_escape_enabled(self, value: bool) -> None:
-        self.settings["selection_fields_escape_enabled"] = value
-
     @property
     def listeners_new_file(self) -> bool:
         return self.settings["settings"]["listeners"]["new_file"]
 
-    @listeners_new_file.setter
-    def listeners_new_file(self, value: bool) -> None:
-        self.settings["settings"]["listeners"]["new_file"] = value
-
     @property
     def find_preview(self) -> bool:
         return self.settings["settings"]["find"]["preview"]
 
-    @find_preview.setter
-    def find_preview(self, value: bool) -> None:
-        self.settings["settings"]["find"]["preview"] = value
-
     @property
     def find_persist_expression(self) -> bool:
         return self.settings["settings"]["find"]["persist_expression"]
 
-    @find_persist_expression.setter
-    def find_persist_expression(self, value: bool) -> None:
-        self.settings["settings"]["find"]["persist_expression"] = value
-
     @property
     def find_regex_additive_scope(self) -> str:
         return self.settings["settings"]["find"]["regex_additive_scope"]
 
-    @find_regex_additive_scope.setter
-    def find_regex_additive_scope(self, value: str) -> None:
-        self.settings["settings"]["find"]["regex_additive_scope"] = value
-
     @property
     def find_regex_subtractive_scope(self) -> str:
         return self.settings["settings"]["find"]["regex_subtractive_scope"]
 
-    @find_regex_subtractive_scope.setter
-    def find_regex_subtractive_scope(self, value: str) -> None:
-        self.settings["settings"]["find"]["regex_subtractive_scope"] = value
+    @property
+    def find_pattern_separator(self) -> str:
+        return self.settings["settings"]["find"]["pattern_separator"]
+
+    @property
+    def find_count_only(self) -> bool:
+        return self.settings["settings"]["find"]["count_only"]
 
     @property
     def buffer_assign_random_name(self) -> bool:
         return self.settings["settings"]["buffer"]["assign_random_name"]
 
-    @buffer_assign_random_name.setter
-    def buffer_assign_random_name(self, value: bool) -> None:
-        self.settings["settings"]["buffer"]["assign_random_name"] = value
-
     @property
     def filter_preview(self) -> bool:
         return self.settings["settings"]["filter"]["preview"]
 
-    @filter_preview.setter
-    def filter_preview(self, value: bool) -> None:
-        self.settings["settings"]["filter"]["preview"] = value
-
     @property
     def filter_disable_debounce(self) -> bool:
         return self.settings["settings"]["filter"]["disable_debounce"]
 
-    @filter_disable_debounce.setter
-    def filter_disable_debounce(self, value: bool) -> None:
-        self.settings["settings"]["filter"]["disable_debounce"] = value
+    @property
+    def filter_count_only(self) -> bool:
+        return self.settings["settings"]["filter"]["count_only"]
 
-    def to_dict(self) -> dict[str, Any]:
+    @property
+    def filter_syntax(self) -> str:
+        return self.settings["settings"]["filter"]["syntax"]
+
+    @property
+    def syntax_preview_max_size(self) -> int:
+        return self.settings["settings"]["syntax"]["preview_max_size"]
+
+    @property
+    def syntax_preview_delay(self) -> int:
+        return self.settings["settings"]["syntax"]["preview_delay"]
+
+    @property
+    def occurrences_index(self) -> bool:
+        return self.settings["settings"]["occurrences"]["index"]
+
+    @property
+    def large_file_size(self) -> int:
+        return self.settings["settings"]["large_file"]["size"]
+
+    @property
+    def large_file_regions(self) -> int:
+        return self.settings["settings"]["large_file"]["regions"]
+
+    @property
+    def large_file_async_preview_size(self) -> int:
+        return self.settings["settings"]["large_file"]["async_preview_size"]
+
+    @property
+    def large_file_debounce(self) -> int:
+        return self.settings["settings"]["large_file"]["debounce"]
+
+    def to_dict(self) -> Mapping[str, Any]:
         return self.settings
 
 
+def _freeze(value: Any) -> Any:
+    if isinstance(value, Mapping):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _changed_paths(old: Any, new: Any, path: KeyPath = ()) -> Set[KeyPath]:
+    if isinstance(old, Mapping) and isinstance(new, Mapping):
+        changed: Set[KeyPath] = set()
+        for key in set(old) | set(new):
+            if key not in old or key not in new:
+                changed.add(path + (key,))
+            else:
+                changed |= _changed_paths(old[key], new[key], path + (key,))
+        return changed
+    return set() if old == new else {path}
+
+
+def _related(first: KeyPath, second: KeyPath) -> bool:
+    """Whether one of the key paths contains the other."""
+    length = min(len(first), len(second))
+    return first[:length] == second[:length]
+
+
 settings = Settings()
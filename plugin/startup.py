@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+import sublime_plugin
+
+from ..lib import startup
+from .utils import show_report
+
+
+class BufferUtilsStartupReportCommand(sublime_plugin.WindowCommand):
+    def run(self) -> None:
+        """Show how long each module of the package took to import."""
+        lines = [
+            f"Loaded in {startup.total_ms():.2f} ms "
+            f"(budget {startup.STARTUP_BUDGET_MS:.0f} ms)",
+            "",
+            f"{'own ms':>10} {'total ms':>10}  module",
+        ]
+        for name, total, own in startup.report():
+            lines.append(f"{own:>10.2f} {total:>10.2f}  {name}")
+
+        show_report(self.window, "BufferUtils Startup", "\n".join(lines))
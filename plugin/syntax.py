@@ -1,22 +1,177 @@
 from __future__ import annotations
 
-from typing import Optional, Sequence, Tuple
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 import sublime
 import sublime_plugin
-from vision.context import Context
 
 from .common import BufferUtilsHandler
+from .constants import PACKAGE_NAME
+from .large_file import is_large
+from .metrics import instrument
+from .settings import settings
+
+PREFERENCES = "Preferences.sublime-settings"
+SYNTAX_EXTENSIONS = (".sublime-syntax", ".tmLanguage")
+
+CatalogEntry = Tuple[List[sublime.ListInputItem], Dict[str, int]]
+
+
+class SyntaxCatalog:
+    """
+    The sorted syntax list items and a map from syntax path to list index,
+    built on first use and rebuilt only once the installed packages change.
+    """
+
+    def __init__(self) -> None:
+        self._entries: Dict[bool, CatalogEntry] = {}
+        self._previews: Dict[str, str] = {}
+        self._preferences = sublime.load_settings(PREFERENCES)
+        self._ignored_packages = self._preferences.get("ignored_packages", [])
+        self.register_on_change()
+
+    def register_on_change(self) -> None:
+        key = f"{PACKAGE_NAME}.syntax_catalog"
+        self._preferences.clear_on_change(key)
+        self._preferences.add_on_change(key, self._on_preferences_change)
+
+    def items(self, show_hidden: bool = False) -> CatalogEntry:
+        entry = self._entries.get(show_hidden)
+        if entry is None:
+            entry = self._entries[show_hidden] = self._build(show_hidden)
+        return entry
+
+    def preview(self, syntax: str) -> str:
+        """The rendered details of a syntax, including its override status."""
+        html = self._previews.get(syntax)
+        if html is None:
+            html = self._previews[syntax] = render_preview(syntax)
+        return html
+
+    def invalidate(self) -> None:
+        self._entries.clear()
+        self._previews.clear()
+
+    def _build(self, show_hidden: bool) -> CatalogEntry:
+        syntax_list = sorted(
+            (
+                syntax
+                for syntax in sublime.list_syntaxes()
+                if show_hidden or not syntax.hidden
+            ),
+            key=lambda x: x.name,
+        )
+        list_input_items = [
+            sublime.ListInputItem(
+                syntax.name,
+                syntax.path,
+                details="Provided by: <strong><u>{0}</u></strong>".format(
+                    syntax.path.split("/")[1]
+                ),
+                annotation=syntax.scope,
+            )
+            for syntax in syntax_list
+        ]
+        indices: Dict[str, int] = {}
+        for index, syntax in enumerate(syntax_list):
+            indices.setdefault(syntax.path, index)
+        return list_input_items, indices
+
+    def _on_preferences_change(self) -> None:
+        # packages are (un)installed and upgraded while being ignored
+        ignored_packages = self._preferences.get("ignored_packages", [])
+        if ignored_packages != self._ignored_packages:
+            self._ignored_packages = ignored_packages
+            self.invalidate()
+
+
+@lru_cache(maxsize=None)
+def override_audit_package_info() -> Any:
+    """The PackageInfo class of OverrideAudit, probed on first use."""
+    try:
+        from OverrideAudit.lib.packages import PackageInfo
+    except ImportError:
+        return None
+    return PackageInfo
+
+
+def render_preview(syntax: str) -> str:
+    """The details of a syntax, which may scan its package for overrides."""
+    from vision.context import Context
+
+    # Extract package and file information
+    parts = syntax.split("/")
+    package_name = parts[1]
+    file_name = parts[-1]
+
+    PackageInfo = override_audit_package_info()
+    supports_override_audit = PackageInfo is not None
+
+    has_override = False
+    if supports_override_audit:
+        pkg_info = PackageInfo(name=package_name)
+        has_override = file_name in pkg_info.override_files()
+
+    ctx = Context()
+    root = ctx.html()
+    with root:
+        with ctx.body():
+            ctx.style(
+                {
+                    "a": {
+                        "color": "color(var(--foreground) alpha(0.6))",
+                        "text-decoration": "none",
+                    },
+                    ".override": {
+                        "display": "inline-block"
+                        if supports_override_audit
+                        else "none",
+                        "color": "color(var(--foreground) alpha(0.6))",
+                        "background-color": "color(var(--foreground) alpha(0.08))",
+                        "border-radius": "4px",
+                        "padding": "0.05em 4px",
+                        "margin-top": "0.2em",
+                        "font-size": "0.9em",
+                    },
+                }
+            )
+            ctx.strong("Details ")
+            ctx.small("(Has Override)" if has_override else "")
+            with ctx.div():
+                with ctx.small():
+                    ctx.strong("Path: ")
+                    ctx.small(file_name)
+                with ctx.div():
+                    with ctx.div().set_classes("append", "override"):
+                        with ctx.a(
+                            href=sublime.command_url(
+                                "override_audit_create_override",
+                                {
+                                    "file": syntax.split("/")[-1],
+                                    "package": package_name,
+                                },
+                            ),
+                        ):
+                            ctx.small(
+                                "Create Override"
+                                if not has_override
+                                else "Edit Override"
+                            )
+
+    return root.render()
+
 
-supports_override_audit = False
-try:
-    from OverrideAudit.lib.packages import PackageInfo
+catalog = SyntaxCatalog()
 
-    supports_override_audit = True
-except ImportError:
-    pass
 
+class SyntaxCatalogListener(sublime_plugin.EventListener):
+    def on_post_save_async(self, view: sublime.View) -> None:
+        if (view.file_name() or "").endswith(SYNTAX_EXTENSIONS):
+            catalog.invalidate()
 
+
+@instrument
 class BufferUtilsSetSyntaxCommand(BufferUtilsHandler, sublime_plugin.TextCommand):
     def run(self, _, syntax: str, **kwargs) -> None:
         self.view.set_syntax_file(syntax)
@@ -29,11 +184,14 @@ class BufferUtilsSetSyntaxCommand(BufferUtilsHandler, sublime_plugin.TextCommand
         return "Syntax"
 
 
+@instrument
 class SyntaxSelectorListInputHandler(sublime_plugin.ListInputHandler):
     def __init__(self, view: Optional[sublime.View], args: dict = {}):
         self.view: sublime.View | None = view
         self.args: dict = args
         self._prev_syntax: sublime.Syntax | None = None
+        # the syntax waiting to be assigned by the live preview
+        self._pending: str | None = None
 
         if self.view:
             self._prev_syntax = self.view.syntax()
@@ -46,101 +204,46 @@ class SyntaxSelectorListInputHandler(sublime_plugin.ListInputHandler):
 
     def preview(self, syntax: str):
         if self.view:
-            self.view.assign_syntax(syntax)
+            self._schedule_assign(syntax)
+        return sublime.Html(catalog.preview(syntax))
 
-        # Extract package and file information
-        parts = syntax.split("/")
-        package_name = parts[1]
-        file_name = parts[-1]
-
-        has_override = False
-        if supports_override_audit:
-            pkg_info = PackageInfo(name=package_name)
-            has_override = file_name in pkg_info.override_files()
-
-        ctx = Context()
-        root = ctx.html()
-        with root:
-            with ctx.body():
-                ctx.style(
-                    {
-                        "a": {
-                            "color": "color(var(--foreground) alpha(0.6))",
-                            "text-decoration": "none",
-                        },
-                        ".override": {
-                            "display": "inline-block"
-                            if supports_override_audit
-                            else "none",
-                            "color": "color(var(--foreground) alpha(0.6))",
-                            "background-color": "color(var(--foreground) alpha(0.08))",
-                            "border-radius": "4px",
-                            "padding": "0.05em 4px",
-                            "margin-top": "0.2em",
-                            "font-size": "0.9em",
-                        },
-                    }
-                )
-                ctx.strong("Details ")
-                ctx.small("(Has Override)" if has_override else "")
-                with ctx.div():
-                    with ctx.small():
-                        ctx.strong("Path: ")
-                        ctx.small(file_name)
-                    with ctx.div():
-                        with ctx.div().set_classes("append", "override"):
-                            with ctx.a(
-                                href=sublime.command_url(
-                                    "override_audit_create_override",
-                                    {
-                                        "file": syntax.split("/")[-1],
-                                        "package": package_name,
-                                    },
-                                ),
-                            ):
-                                ctx.small(
-                                    "Create Override"
-                                    if not has_override
-                                    else "Edit Override"
-                                )
-
-        return sublime.Html(root.render())
+    def confirm(self, syntax: str) -> None:
+        self._pending = None
 
     def cancel(self):
-        if self.view:
+        self._pending = None
+        if self.view and self._prev_syntax:
             self.view.assign_syntax(self._prev_syntax.path)
 
+    def _schedule_assign(self, syntax: str) -> None:
+        """
+        Assign the syntax once it stays highlighted for the preview delay,
+        such that scrolling the list does not re-highlight the view each step.
+        """
+        max_size = settings.syntax_preview_max_size
+        if max_size <= 0 or self.view.size() > max_size or is_large(self.view):
+            return
+
+        self._pending = syntax
+        delay = settings.syntax_preview_delay
+        if delay > 0:
+            sublime.set_timeout(lambda: self._assign(syntax), delay)
+        else:
+            self._assign(syntax)
+
+    def _assign(self, syntax: str) -> None:
+        if self._pending != syntax or not self.view.is_valid():
+            return
+        self._pending = None
+        current = self.view.syntax()
+        if current is None or current.path != syntax:
+            self.view.assign_syntax(syntax)
+
     def list_items(self) -> Tuple[Sequence[sublime.ListInputItem], int]:
-        syntax_list = sorted(
-            (
-                syntax
-                for syntax in sublime.list_syntaxes()
-                if self.args.get("show_hidden", False) or not syntax.hidden
-            ),
-            key=lambda x: x.name,
-        )
+        list_input_items, indices = catalog.items(self.args.get("show_hidden", False))
         current_index = (
-            next(
-                (
-                    index
-                    for index, syntax in enumerate(syntax_list)
-                    if syntax.path == self._prev_syntax.path
-                ),
-                0,
-            )
-            if self.args.get("preselect_current_syntax")
+            indices.get(self._prev_syntax.path, 0)
+            if self.args.get("preselect_current_syntax") and self._prev_syntax
             else 0
         )
-        list_input_items = [
-            sublime.ListInputItem(
-                syntax.name,
-                syntax.path,
-                details="Provided by: <strong><u>{0}</u></strong>".format(
-                    syntax.path.split("/")[1]
-                ),
-                annotation=syntax.scope,
-            )
-            for syntax in syntax_list
-        ]
-
         return list_input_items, current_index
@@ -1,77 +1,118 @@
 from __future__ import annotations
 
-import threading
+import os
+import time
 from functools import wraps
-from typing import Any, Callable, List, TypeVar, cast
+from typing import (
+    Any,
+    Callable,
+    Collection,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Type,
+    TypeVar,
+    cast,
+)
 
 import sublime
+import sublime_plugin
 
-from .constants import SETTINGS
+from ..lib.intervals import Interval, IntervalSet
+from .constants import PACKAGE_NAME
+from .settings import settings
 
 T_Callable = TypeVar("T_Callable", bound=Callable[..., Any])
+T_BufferState = TypeVar("T_BufferState", bound="BufferState")
 
-
-class Case:
-    LOWER = 0
-    UPPER = 1
-    CAPITALIZED = 2
-    MIXED = 3
-
-
-class StringAttributes:
-    def __init__(
-        self, delimiter: str, case_types: list[int], groups: list[str]
-    ) -> None:
-        self.delimiter: str = delimiter
-        self.case_types: list[int] = case_types
-        self.groups: list[str] = groups
+# the number of unselected characters which may be read along with a selection
+SNAPSHOT_SLACK = 1 << 16
 
 
 def get_settings(key: str | List[str] = "settings", default: Any = None):
-    settings = sublime.load_settings(SETTINGS)
+    """Read a (nested) key from the cached settings snapshot."""
     if key:
         if isinstance(key, list):
-            result = settings
-            for k in key:
-                result = result.get(k, default)
-                if result is default:
-                    break
-            return result
-        return settings.get(key, default)
-    return settings
+            return settings.get(*key, default=default)
+        return settings.get(key, default=default)
+    return settings.to_dict()
+
+
+def substr_all(view: sublime.View, regions: Sequence[sublime.Region]) -> List[str]:
+    """
+    Read the text of sorted regions. If the regions are dense, their whole
+    span is read at once and sliced instead of reading every region.
+    """
+    if not regions:
+        return []
+    begin, end = regions[0].begin(), regions[-1].end()
+    if end - begin <= 2 * sum(region.size() for region in regions) + SNAPSHOT_SLACK:
+        text = view.substr(sublime.Region(begin, end))
+        return [text[r.begin() - begin : r.end() - begin] for r in regions]
+    return [view.substr(region) for region in regions]
+
+
+def to_regions(intervals: IntervalSet) -> List[sublime.Region]:
+    return [sublime.Region(a, b) for a, b in intervals]
+
+
+def set_selection(
+    view: sublime.View,
+    intervals: IntervalSet,
+    backwards: Collection[Interval] = (),
+) -> None:
+    """
+    Replace the selection of the view with the intervals in one update.
+    The intervals in `backwards` are selected from their end to their begin.
+    """
+    regions = (
+        [
+            sublime.Region(b, a) if (a, b) in backwards else sublime.Region(a, b)
+            for a, b in intervals
+        ]
+        if backwards
+        else to_regions(intervals)
+    )
+    selection = view.sel()
+    selection.clear()
+    selection.add_all(regions)
 
 
 # Adapted from LSP-Copilot
 def debounce(
-    time_s: float = 0.3, disabled: bool = False
+    time_s: float | Callable[..., float] = 0.3, disabled: bool = False
 ) -> Callable[[T_Callable], T_Callable]:
     """
     Debounce a function so that it's called after `time_s` seconds.
     If it's called multiple times in the time frame, it will only run the last call.
     If `disabled` is True, the function is called immediately without debouncing.
+    `time_s` may be a callable, which gets the arguments of each call.
+
+    The call is scheduled with `sublime.set_timeout`, so it runs on the main
+    thread and no timer thread is started per call.
 
     Taken and modified from https://github.com/salesforce/decorator-operations
     """
 
     def decorator(func: T_Callable) -> T_Callable:
+        calls = [0]
+
         @wraps(func)
-        def debounced(*args: Any, **kwargs: Any) -> None:
+        def debounced(*args: Any, **kwargs: Any) -> Any:
             if disabled:
                 return func(*args, **kwargs)
 
-            def call_function() -> Any:
-                delattr(debounced, "_timer")
-                return func(*args, **kwargs)
+            calls[0] += 1
+            call = calls[0]
 
-            timer: threading.Timer | None = getattr(debounced, "_timer", None)
-            if timer is not None:
-                timer.cancel()
+            def call_function() -> None:
+                if calls[0] == call:
+                    func(*args, **kwargs)
 
-            timer = threading.Timer(time_s, call_function)
-            timer.start()
-            setattr(debounced, "_timer", timer)
+            delay = time_s(*args, **kwargs) if callable(time_s) else time_s
+            sublime.set_timeout(call_function, int(delay * 1000))
 
-        setattr(debounced, "_timer", None)
         return cast(T_Callable, debounced)
 
     return decorator
@@ -87,3 +128,88 @@ class MutableView:
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.view.set_read_only(True)
+
+
+def show_report(window: sublime.Window, name: str, text: str) -> sublime.View:
+    """Show the text of a report in a new read-only scratch view."""
+    view = window.new_file()
+    view.set_name(name)
+    view.set_scratch(True)
+    view.settings().set("word_wrap", False)
+    with MutableView(view):
+        view.run_command("append", {"characters": text})
+    return view
+
+
+def cache_file(prefix: str, extension: str) -> str:
+    """A new file, named after the current time, in the package's cache directory."""
+    folder = os.path.join(sublime.cache_path(), PACKAGE_NAME)
+    os.makedirs(folder, exist_ok=True)
+    name = time.strftime(f"{prefix}-%Y%m%d-%H%M%S{extension}", time.localtime())
+    return os.path.join(folder, name)
+
+
+class BufferState:
+    """
+    State of a buffer shared by all of its views, one instance per buffer and
+    subclass. A text change listener is attached on demand and forwards the
+    edits to `on_text_changed`, it is detached once the state is discarded.
+    """
+
+    _states: Dict[int, "BufferState"] = {}
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        cls._states = {}
+
+    def __init__(self, buffer: sublime.Buffer) -> None:
+        self.buffer: sublime.Buffer = buffer
+        self.listener: Optional[BufferChangeListener] = None
+
+    @classmethod
+    def for_view(cls: Type[T_BufferState], view: sublime.View) -> T_BufferState:
+        state = cls._states.get(view.buffer_id())
+        if state is None:
+            state = cls._states[view.buffer_id()] = cls(view.buffer())
+        return cast(T_BufferState, state)
+
+    @classmethod
+    def discard(cls, view: sublime.View) -> None:
+        if state := cls._states.pop(view.buffer_id(), None):
+            state.close()
+
+    def close(self) -> None:
+        self.detach()
+
+    def attach(self) -> None:
+        if self.listener is None:
+            self.listener = BufferChangeListener(self)
+            self.listener.attach(self.buffer)
+
+    def detach(self) -> None:
+        if self.listener is not None and self.listener.is_attached():
+            self.listener.detach()
+        self.listener = None
+
+    def on_text_changed(self, changes: List[sublime.TextChange]) -> None:
+        pass
+
+
+class BufferChangeListener(sublime_plugin.TextChangeListener):
+    def __init__(self, state: Optional[BufferState] = None) -> None:
+        super().__init__()
+        self.state: Optional[BufferState] = state
+
+    @classmethod
+    def is_applicable(cls, buffer: sublime.Buffer) -> bool:
+        # only attached explicitly by a buffer state
+        return False
+
+    def on_text_changed(self, changes: List[sublime.TextChange]) -> None:
+        if self.state is not None:
+            self.state.on_text_changed(changes)
+
+
+def closes_buffer(view: sublime.View) -> bool:
+    """Whether the view being closed is the last view of its buffer."""
+    return not [v for v in view.buffer().views() if v.id() != view.id()]
@@ -0,0 +1,112 @@
+"""
+The query parser and the line scanner of the filter.
+
+Run from the package root: `python -m unittest discover -s tests`
+"""
+from __future__ import annotations
+
+import re
+import unittest
+
+from lib.query import And, Literal, Node, Not, Or, Query, QueryError, Regex
+
+
+class ParserTest(unittest.TestCase):
+    def test_node_is_abstract(self):
+        with self.assertRaises(TypeError):
+            Node()
+
+    def test_not_binds_before_and_before_or(self):
+        root = Query("a or not b and c").root
+        self.assertIsInstance(root, Or)
+        literal, conjunction = sorted(root.operands, key=lambda n: n.cost)
+        self.assertIsInstance(literal, Literal)
+        self.assertIsInstance(conjunction, And)
+        self.assertEqual(
+            sorted(type(node).__name__ for node in conjunction.operands),
+            ["Literal", "Not"],
+        )
+
+    def test_adjacent_terms_are_combined_with_and(self):
+        query = Query("error db")
+        self.assertIsInstance(query.root, And)
+        self.assertTrue(query.match("db error"))
+        self.assertFalse(query.match("error"))
+
+    def test_parentheses_group_before_and(self):
+        query = Query("error and (db or cache)")
+        self.assertTrue(query.match("cache error"))
+        self.assertFalse(query.match("cache"))
+        self.assertFalse(Query("error and db or cache").match("error"))
+        self.assertTrue(Query("error and db or cache").match("cache"))
+
+    def test_terms(self):
+        self.assertIsInstance(Query("/err(or)?/").root, Regex)
+        self.assertTrue(Query('"not"').match("NOT found"))
+        self.assertTrue(Query(r'"a \"b\""').match('a "b"'))
+        self.assertTrue(Query("/a\\/b/").match("a/b"))
+        self.assertIsInstance(Query("not not x").root.operand, Not)
+
+    def test_errors(self):
+        for text, message in (
+            ("", "empty query"),
+            ("   ", "empty query"),
+            ("(a or b", "missing ')'"),
+            ("a and", "ends with an operator"),
+            ("not", "ends with an operator"),
+            ("a )", "unexpected ')'"),
+            ("or a", "unexpected 'or'"),
+            ("/a[/", "invalid regex"),
+        ):
+            with self.subTest(text=text):
+                with self.assertRaisesRegex(QueryError, re.escape(message)):
+                    Query(text)
+
+
+class ScanTest(unittest.TestCase):
+    TEXT = "error: db down\nok\nERROR: cache\nerror healthcheck\n"
+
+    def scan(self, query: str, text: str = TEXT, offset: int = 0):
+        return list(Query(query).scan(text, offset))
+
+    def test_literal_prefilter(self):
+        query = Query("error and not healthcheck")
+        self.assertEqual(query.literal, "error")
+        self.assertEqual(Query("error db").literal, "error")
+        self.assertEqual(
+            self.scan("error and not healthcheck", offset=100),
+            [(100, "error: db down"), (118, "ERROR: cache")],
+        )
+
+    def test_without_literal(self):
+        self.assertIsNone(Query("error or ok").literal)
+        self.assertIsNone(Query("not error").literal)
+        self.assertEqual(
+            self.scan("error or ok", offset=10),
+            [
+                (10, "error: db down"),
+                (25, "ok"),
+                (28, "ERROR: cache"),
+                (41, "error healthcheck"),
+            ],
+        )
+        self.assertEqual(self.scan("not error"), [(15, "ok")])
+
+    def test_last_line_without_newline(self):
+        self.assertEqual(self.scan("cache", "a\nb cache"), [(2, "b cache")])
+
+    def test_literal_found_twice_in_a_line(self):
+        self.assertEqual(self.scan("a", "a a\nb\na"), [(0, "a a"), (6, "a")])
+
+    def test_lowering_changes_the_length(self):
+        # "İ" lowers to two characters, the offsets are taken from the text
+        text = "İstanbul\nerror İ\nok\nerror"
+        self.assertNotEqual(len(text.lower()), len(text))
+        self.assertEqual(
+            self.scan("error", text, offset=5), [(14, "error İ"), (25, "error")]
+        )
+        self.assertEqual(self.scan("/^İ/", text), [(0, "İstanbul")])
+
+
+if __name__ == "__main__":
+    unittest.main()